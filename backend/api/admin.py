@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import OuraMetric, UserProfile, AIInsight
+from .models import OuraMetric, HeartRateBlock, UserProfile, AIInsight, SyncState, SyncRequest, BackfillChunk, DailyStatistic, LLMResponse, LLMCall
 
 
 @admin.register(OuraMetric)
@@ -12,9 +12,17 @@ class OuraMetricAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at', 'updated_at')
 
 
+@admin.register(HeartRateBlock)
+class HeartRateBlockAdmin(admin.ModelAdmin):
+    list_display = ('user', 'day', 'samples', 'min_bpm', 'max_bpm', 'updated_at')
+    search_fields = ('user__username',)
+    ordering = ('-day',)
+    exclude = ('offsets', 'bpm')  # packed arrays, nothing readable
+
+
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
-    list_display = ('user', 'token_created_at')
+    list_display = ('user', 'oura_user_id', 'token_created_at')
     search_fields = ('user__username',)
     readonly_fields = ('token_created_at',)
     
@@ -31,3 +39,50 @@ class AIInsightAdmin(admin.ModelAdmin):
     search_fields = ('user__username', 'insight_type')
     ordering = ('-created_at',)
     readonly_fields = ('created_at',)
+
+
+@admin.register(SyncState)
+class SyncStateAdmin(admin.ModelAdmin):
+    list_display = ('user', 'endpoint', 'last_synced_day', 'last_synced_at')
+    list_filter = ('endpoint',)
+    search_fields = ('user__username',)
+
+
+@admin.register(SyncRequest)
+class SyncRequestAdmin(admin.ModelAdmin):
+    list_display = ('user', 'endpoint', 'day', 'requested_at', 'attempts', 'retry_after')
+    list_filter = ('endpoint',)
+    search_fields = ('user__username',)
+    ordering = ('requested_at',)
+
+
+@admin.register(BackfillChunk)
+class BackfillChunkAdmin(admin.ModelAdmin):
+    list_display = ('user', 'endpoint', 'start_date', 'end_date', 'status', 'rows', 'attempts', 'updated_at')
+    list_filter = ('endpoint', 'status')
+    search_fields = ('user__username',)
+    ordering = ('-start_date',)
+
+
+@admin.register(DailyStatistic)
+class DailyStatisticAdmin(admin.ModelAdmin):
+    list_display = ('user', 'date', 'window', 'updated_at')
+    list_filter = ('window',)
+    search_fields = ('user__username',)
+    ordering = ('-date', 'window')
+
+
+@admin.register(LLMResponse)
+class LLMResponseAdmin(admin.ModelAdmin):
+    list_display = ('fingerprint', 'model', 'hits', 'created_at', 'last_used_at')
+    list_filter = ('model',)
+    ordering = ('-last_used_at',)
+    readonly_fields = ('created_at', 'last_used_at')
+
+
+@admin.register(LLMCall)
+class LLMCallAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'model', 'prompt_tokens', 'completion_tokens', 'latency_ms', 'cached', 'created_at')
+    list_filter = ('kind', 'cached', 'estimated')
+    ordering = ('-created_at',)
+    readonly_fields = ('created_at',)
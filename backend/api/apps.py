@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "api"
+
+    def ready(self):
+        # shared HTTP clients get closed cleanly when the worker exits
+        from .services import http_clients
+        http_clients.register_shutdown()
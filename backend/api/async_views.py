@@ -0,0 +1,240 @@
+"""
+Async versions of the I/O-bound endpoints, for running under myoura/asgi.py.
+
+Same URLs, same payloads and the same caches as the DRF views in views.py -
+urls.py swaps these in when ASYNC_VIEWS=True. The difference is that a slow
+Oura or OpenAI call is an await on the event loop, so one ASGI worker keeps
+serving other requests meanwhile instead of parking a thread on it.
+
+Plain Django async views rather than DRF: APIView is sync-only in DRF 3.14.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from .models import OuraMetric, UserProfile
+from .serializers import OuraMetricSerializer, ChatRequestSerializer
+from .renderers import ORJSONRenderer
+from .services.openai_service import OpenAIService
+from .services import sync_service, response_cache, single_flight, insights, export, payloads
+from .views import _is_stale, _chat_event_stream
+
+
+async def _connected_profile():
+    # For MVP: the one user with an Oura token (same lookup as the sync views)
+    return await UserProfile.objects.filter(
+        oura_access_token__isnull=False
+    ).exclude(oura_access_token='').select_related('user').afirst()
+
+
+async def _recent_metrics(user, limit):
+    # serializer output on purpose - insights fingerprint this exact shape
+    metrics = [m async for m in OuraMetric.objects.filter(user=user).order_by('-date')[:limit]]
+    return OuraMetricSerializer(metrics, many=True).data
+
+
+def _json_body(request):
+    # the JSON object body, or None - DRF's request.data would 400 on a list or scalar too
+    try:
+        body = json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+    return body if isinstance(body, dict) else None
+
+
+def _respond(payload, status=200):
+    return HttpResponse(
+        ORJSONRenderer().render(payload), status=status, content_type='application/json'
+    )
+
+
+@require_GET
+async def metrics_view(request):
+    profile = await _connected_profile()
+    if not profile:
+        return _respond({'error': 'No Oura account connected'}, 400)
+    user = profile.user
+
+    force_refresh = request.GET.get('force', 'false').lower() == 'true'
+
+    try:
+        page = payloads.parse_metrics_params(request.GET)
+    except ValueError as e:
+        return _respond({'error': str(e)}, 400)
+    variant = payloads.page_variant(page)
+    cache_key = await response_cache.akey(user.id, response_cache.METRICS, variant)
+
+    if not force_refresh:
+        cached = await response_cache.aget(cache_key)
+        if cached is not None:
+            return _respond(cached)
+
+    synced_at = await sync_service.alast_synced_at(user, sync_service.METRICS)
+    if force_refresh or _is_stale(synced_at):
+        try:
+            await single_flight.ado(f'sync:metrics:{user.id}', lambda: sync_service.async_sync_metrics(
+                user, profile.oura_access_token, days=30,
+                wait=settings.OURA_SYNC_LOCK_WAIT
+            ))
+            synced_at = await sync_service.alast_synced_at(user, sync_service.METRICS)
+        except Exception as e:
+            return _respond({'error': f'Oura API error: {str(e)}'}, 500)
+
+    rows, next_cursor = await payloads.ametrics_page(user, **page)
+    payload = {'metrics': rows, 'next_cursor': next_cursor, 'synced_at': synced_at}
+    await response_cache.astore(cache_key, payload, settings.RESPONSE_CACHE_TTL)
+    return _respond(payload)
+
+
+@require_GET
+async def workouts_view(request):
+    profile = await _connected_profile()
+    if not profile:
+        return _respond({'error': 'No Oura account connected'}, 400)
+    user = profile.user
+
+    force_refresh = request.GET.get('force', 'false').lower() == 'true'
+
+    try:
+        page = payloads.parse_workouts_params(request.GET)
+    except ValueError as e:
+        return _respond({'error': str(e)}, 400)
+    variant = payloads.page_variant(page)
+    cache_key = await response_cache.akey(user.id, response_cache.WORKOUTS, variant)
+
+    if not force_refresh:
+        cached = await response_cache.aget(cache_key)
+        if cached is not None:
+            return _respond(cached)
+
+    synced_at = await sync_service.alast_synced_at(user, sync_service.WORKOUTS)
+    if synced_at is None or force_refresh:
+        try:
+            await single_flight.ado(f'sync:workouts:{user.id}', lambda: sync_service.async_sync_workouts(
+                user, profile.oura_access_token, days=30,
+                wait=settings.OURA_SYNC_LOCK_WAIT
+            ))
+            synced_at = await sync_service.alast_synced_at(user, sync_service.WORKOUTS)
+        except Exception as e:
+            return _respond({'error': f'Failed to fetch workouts: {str(e)}'}, 500)
+
+    workouts_list, next_cursor = await payloads.aworkouts_page(user, **page)
+
+    payload = {'workouts': workouts_list, 'next_cursor': next_cursor, 'synced_at': synced_at}
+    await response_cache.astore(cache_key, payload, settings.RESPONSE_CACHE_TTL)
+    return _respond(payload)
+
+
+@csrf_exempt
+@require_POST
+async def coach_summary_view(request):
+    body = _json_body(request)
+    if body is None:
+        return _respond({'error': 'Expected a JSON object'}, 400)
+
+    profile = await _connected_profile()
+    if not profile:
+        return _respond({'error': 'No user found'}, 400)
+    user = profile.user
+
+    force_regenerate = body.get('force', False)
+    cache_key = await response_cache.akey(user.id, response_cache.COACH_SUMMARY)
+
+    if not force_regenerate:
+        cached = await response_cache.aget(cache_key)
+        if cached is not None:
+            return _respond(cached)
+
+    metrics_data = await _recent_metrics(user, insights.METRICS_DAYS)
+    if not metrics_data:
+        return _respond({'error': 'No metrics available'}, 400)
+
+    fingerprint = insights.metrics_fingerprint(metrics_data)
+    if not force_regenerate:
+        stored = await sync_to_async(insights.precomputed)(user, insights.COACH_SUMMARY, fingerprint)
+        if stored:
+            await response_cache.astore(cache_key, stored, insights.COACH_SUMMARY_TTL)
+            return _respond(stored)
+
+    result = await single_flight.ado(f'coach_summary:{user.id}', lambda: insights.agenerate(
+        user, insights.COACH_SUMMARY, metrics_data, fingerprint,
+        use_cache=not force_regenerate
+    ))
+    return _respond(result)
+
+
+@require_GET
+async def trend_insight_view(request):
+    profile = await _connected_profile()
+    if not profile:
+        return _respond({'error': 'No user found'}, 400)
+    user = profile.user
+
+    data = await _recent_metrics(user, insights.METRICS_DAYS)
+    if not data:
+        return _respond({'error': 'No metrics'}, 400)
+
+    fingerprint = insights.metrics_fingerprint(data)
+    stored = await sync_to_async(insights.precomputed)(user, insights.TREND_INSIGHT, fingerprint)
+    if stored:
+        return _respond(stored)
+
+    result = await single_flight.ado(f'trend_insight:{user.id}', lambda: insights.agenerate(
+        user, insights.TREND_INSIGHT, data, fingerprint
+    ))
+    return _respond(result)
+
+
+@csrf_exempt
+@require_POST
+async def chat_view(request):
+    body = _json_body(request)
+    serializer = ChatRequestSerializer(data=body if body is not None else {})
+    if not serializer.is_valid():
+        return _respond(serializer.errors, 400)
+
+    msg = serializer.validated_data['message']
+
+    profile = await _connected_profile()
+    if not profile:
+        return _respond({'error': 'No user found'}, 400)
+
+    metrics_data = await _recent_metrics(profile.user, 7)
+
+    try:
+        ai = OpenAIService()
+
+        if request.GET.get('stream', '').lower() in ('1', 'true'):
+            response = StreamingHttpResponse(
+                _chat_event_stream(ai, msg, metrics_data),
+                content_type='text/event-stream'
+            )
+            response['Cache-Control'] = 'no-cache'
+            response['X-Accel-Buffering'] = 'no'
+            return response
+
+        return _respond(await ai.agenerate_chat_response(msg, metrics_data))
+    except Exception as e:
+        return _respond({'error': str(e)}, 500)
+
+
+@require_GET
+async def export_view(request):
+    profile = await _connected_profile()
+    if not profile:
+        return _respond({'error': 'No Oura account connected'}, 400)
+
+    try:
+        resource, fields, start, end = export.parse_params(request.GET)
+    except ValueError as e:
+        return _respond({'error': str(e)}, 400)
+
+    qs = export.queryset(profile.user, resource, fields, start, end)
+    body = export.abody(qs, resource, fields, settings.EXPORT_CHUNK_SIZE)
+    response = StreamingHttpResponse(body, content_type='application/x-ndjson')
+    response['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,102 @@
+import json
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from api.services import rate_limit
+from api.services.oura_service import OuraService
+
+
+BENCH_TOKEN = '__bench_oura_fetch__'
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark: serial (OURA_FETCH_WORKERS=1) vs parallel metric fetches against '
+        'a local stub Oura API that adds a fixed latency to every request'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--latency', type=float, default=150,
+                            help='ms the stub waits before answering each request')
+        parser.add_argument('--days', type=int, nargs='+', default=[7, 30, 365])
+        parser.add_argument('--workers', type=int, default=4,
+                            help='OURA_FETCH_WORKERS for the parallel run')
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _stub_handler(options['latency'] / 1000))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f'http://127.0.0.1:{server.server_address[1]}'
+        # the per-token budget would otherwise be what gets measured
+        rate_limit.set_rate(BENCH_TOKEN, 1000, 1000)
+
+        try:
+            self.stdout.write(f"stub latency {options['latency']:.0f} ms")
+            self.stdout.write(f"{'days':>6}{'requests':>10}{'serial ms':>11}{'parallel ms':>13}{'speedup':>9}")
+            for days in options['days']:
+                serial, requests_made = self._time(base, days, 1, options['repeat'])
+                parallel, _ = self._time(base, days, options['workers'], options['repeat'])
+                self.stdout.write(
+                    f'{days:>6}{requests_made:>10}{serial:>11.0f}{parallel:>13.0f}{serial / parallel:>8.1f}x'
+                )
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def _time(self, base, days, workers, repeat):
+        best = float('inf')
+        with override_settings(OURA_API_BASE=base, OURA_FETCH_WORKERS=workers):
+            for _ in range(repeat):
+                before = rate_limit.retry_stats()['requests']
+                started = time.perf_counter()
+                rows = OuraService(BENCH_TOKEN).fetch_metrics(days=days)
+                best = min(best, time.perf_counter() - started)
+                requests_made = rate_limit.retry_stats()['requests'] - before
+        assert len(rows) >= days  # sanity check: the stub answered every endpoint
+        return best * 1000, requests_made
+
+
+def _stub_handler(latency):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+
+        def do_GET(self):
+            time.sleep(latency)
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            endpoint = url.path.rsplit('/', 1)[-1]
+            start = date.fromisoformat(query['start_date'][0])
+            end = date.fromisoformat(query['end_date'][0])
+            records = [
+                _record(endpoint, (start + timedelta(days=i)).isoformat())
+                for i in range((end - start).days + 1)
+            ]
+            body = json.dumps({'data': records, 'next_token': None}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def _record(endpoint, day):
+    if endpoint == 'sleep':
+        return {'day': day, 'total_sleep_duration': 27000, 'deep_sleep_duration': 5400,
+                'rem_sleep_duration': 6300, 'bedtime_start': f'{day}T22:30:00+00:00'}
+    if endpoint == 'daily_readiness':
+        return {'day': day, 'score': 80, 'contributors': {'hrv_balance': 70, 'resting_heart_rate': 55}}
+    if endpoint == 'daily_activity':
+        return {'day': day, 'score': 80, 'steps': 8000, 'active_calories': 400}
+    return {'day': day, 'score': 75}
@@ -0,0 +1,106 @@
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from api.models import OuraMetric, Workout
+from api.renderers import ORJSONRenderer
+from api.serializers import OuraMetricSerializer
+from api.services import payloads
+
+
+class Command(BaseCommand):
+    help = (
+        'Microbenchmark: ModelSerializer + JSONRenderer vs .values() + ORJSONRenderer '
+        'for metric and workout payloads. Runs on throwaway rows that get rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[30, 365, 3650])
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        self.repeat = options['repeat']
+
+        with transaction.atomic():
+            user = User.objects.create(username='__bench_serialization__')
+            self._seed(user, max(options['rows']))
+
+            self.stdout.write(f"{'payload':<10}{'rows':>6}{'old ms':>10}{'new ms':>10}{'speedup':>9}{'rows/s new':>13}")
+            for rows in options['rows']:
+                self._compare('metrics', rows, lambda: self._old_metrics(user, rows), lambda: self._new_metrics(user, rows))
+                self._compare('workouts', rows, lambda: self._old_workouts(user, rows), lambda: self._new_workouts(user, rows))
+
+            transaction.set_rollback(True)
+
+    def _compare(self, name, rows, old, new):
+        assert len(old()) == len(new())  # warm up + sanity check
+        old_ms = self._time(old)
+        new_ms = self._time(new)
+        self.stdout.write(
+            f'{name:<10}{rows:>6}{old_ms:>10.2f}{new_ms:>10.2f}{old_ms / new_ms:>8.1f}x'
+            f'{rows / (new_ms / 1000):>13,.0f}'
+        )
+
+    def _time(self, fn):
+        # best of N - least noisy for short runs
+        best = float('inf')
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - started)
+        return best * 1000
+
+    # the read paths before and after, query + serialize + render
+
+    def _old_metrics(self, user, rows):
+        metrics = OuraMetric.objects.filter(user=user).order_by('-date')[:rows]
+        return JSONRenderer().render({'metrics': OuraMetricSerializer(metrics, many=True).data})
+
+    def _new_metrics(self, user, rows):
+        return ORJSONRenderer().render({'metrics': payloads.recent_metrics(user, rows)})
+
+    def _old_workouts(self, user, rows):
+        workouts_list = []
+        for workout in Workout.objects.filter(user=user).order_by('-day')[:rows]:
+            workouts_list.append({
+                'id': workout.id,
+                'day': workout.day,
+                'activity': workout.activity,
+                'calories': workout.calories,
+                'intensity': workout.intensity,
+                'duration_minutes': workout.duration_minutes,
+                'start_datetime': workout.start_datetime,
+                'end_datetime': workout.end_datetime,
+                'source': workout.source,
+            })
+        return JSONRenderer().render({'workouts': workouts_list})
+
+    def _new_workouts(self, user, rows):
+        return ORJSONRenderer().render({'workouts': payloads.recent_workouts(user, rows)})
+
+    def _seed(self, user, rows):
+        today = date.today()
+        OuraMetric.objects.bulk_create([
+            OuraMetric(
+                user=user, date=today - timedelta(days=i),
+                readiness_score=70 + i % 30, sleep_score=75, activity_score=80,
+                sleep_duration=7.25, deep_sleep=1.5, rem_sleep=1.75,
+                bedtime_start=datetime(2024, 1, 1, 22, 30, tzinfo=dt_timezone.utc) - timedelta(days=i),
+                hrv=50 + i % 20, resting_hr=55, steps=8000 + i, active_calories=400,
+            )
+            for i in range(rows)
+        ], batch_size=500)
+        Workout.objects.bulk_create([
+            Workout(
+                user=user, oura_id=f'__bench__{i}', day=today - timedelta(days=i),
+                activity='running', calories=300, intensity='moderate',
+                start_datetime=datetime(2024, 1, 1, 7, 0, tzinfo=dt_timezone.utc) - timedelta(days=i),
+                end_datetime=datetime(2024, 1, 1, 7, 45, tzinfo=dt_timezone.utc) - timedelta(days=i),
+                source='manual',
+            )
+            for i in range(rows)
+        ], batch_size=500)
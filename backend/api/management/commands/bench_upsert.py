@@ -0,0 +1,136 @@
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from api.models import OuraMetric, Workout
+from api.services import persistence
+
+
+class Command(BaseCommand):
+    help = (
+        'Microbenchmark: per-row update_or_create vs bulk_create(update_conflicts=True) '
+        'for OuraMetric and Workout upserts, on the configured database. Runs '
+        'against a throwaway user that is deleted afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[30, 365, 3650])
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        self.repeat = options['repeat']
+        # no outer transaction: the old loop ran in autocommit, a commit per row
+        user = User.objects.create(username='__bench_upsert__')
+        try:
+            self.stdout.write(f'database: {connection.vendor}')
+            self.stdout.write(
+                f"{'model':<10}{'case':<8}{'rows':>6}{'old q':>8}{'old ms':>10}"
+                f"{'new q':>7}{'new ms':>9}{'speedup':>9}"
+            )
+            for rows in options['rows']:
+                metrics = self._metric_rows(rows)
+                workouts = self._workout_rows(rows)
+                for case in ('insert', 'update'):
+                    self._compare(
+                        'metrics', case, rows, OuraMetric, user,
+                        lambda: self._old_metrics(user, metrics),
+                        lambda: persistence.upsert_metrics(user, metrics, refresh_rollups=False),
+                    )
+                    self._compare(
+                        'workouts', case, rows, Workout, user,
+                        lambda: self._old_workouts(user, workouts),
+                        lambda: persistence.upsert_workouts(user, workouts),
+                    )
+        finally:
+            user.delete()
+
+    def _compare(self, name, case, rows, model, user, old, new):
+        old_queries, old_ms = self._time(model, user, case, old)
+        new_queries, new_ms = self._time(model, user, case, new)
+        self.stdout.write(
+            f'{name:<10}{case:<8}{rows:>6}{old_queries:>8}{old_ms:>10.1f}'
+            f'{new_queries:>7}{new_ms:>9.1f}{old_ms / new_ms:>8.1f}x'
+        )
+
+    def _time(self, model, user, case, fn):
+        # best of N; 'insert' starts from no rows, 'update' from the rows already there
+        best = float('inf')
+        queries = 0
+        for _ in range(self.repeat):
+            model.objects.filter(user=user).delete()
+            if case == 'update':
+                fn()
+            counter = _QueryCounter()
+            with connection.execute_wrapper(counter):
+                started = time.perf_counter()
+                fn()
+                best = min(best, time.perf_counter() - started)
+            queries = counter.count
+        return queries, best * 1000
+
+    # the write path before persistence.py, one update_or_create per row
+
+    def _old_metrics(self, user, rows):
+        for item in rows:
+            OuraMetric.objects.update_or_create(
+                user=user,
+                date=item['date'],
+                defaults={field: item.get(field) for field in persistence.METRIC_FIELDS},
+            )
+
+    def _old_workouts(self, user, rows):
+        for item in rows:
+            Workout.objects.update_or_create(
+                oura_id=item['id'],
+                defaults={
+                    'user': user,
+                    'day': item['day'],
+                    'activity': item.get('activity', 'Unknown'),
+                    'calories': item.get('calories'),
+                    'intensity': item.get('intensity'),
+                    'start_datetime': item.get('start_datetime'),
+                    'end_datetime': item.get('end_datetime'),
+                    'source': item.get('source'),
+                },
+            )
+
+    # merged-day / raw-workout dicts shaped like OuraService output
+
+    def _metric_rows(self, rows):
+        today = date.today()
+        return [
+            {
+                'date': (today - timedelta(days=i)).isoformat(),
+                'readiness_score': 70 + i % 30, 'sleep_score': 75, 'activity_score': 80,
+                'sleep_duration': 7.25, 'deep_sleep': 1.5, 'rem_sleep': 1.75,
+                'bedtime_start': (datetime(2024, 1, 1, 22, 30, tzinfo=dt_timezone.utc) - timedelta(days=i)).isoformat(),
+                'hrv': 50 + i % 20, 'resting_hr': 55, 'steps': 8000 + i, 'active_calories': 400,
+            }
+            for i in range(rows)
+        ]
+
+    def _workout_rows(self, rows):
+        today = date.today()
+        return [
+            {
+                'id': f'__bench_upsert__{i}', 'day': (today - timedelta(days=i)).isoformat(),
+                'activity': 'running', 'calories': 300, 'intensity': 'moderate',
+                'start_datetime': (datetime(2024, 1, 1, 7, 0, tzinfo=dt_timezone.utc) - timedelta(days=i)).isoformat(),
+                'end_datetime': (datetime(2024, 1, 1, 7, 45, tzinfo=dt_timezone.utc) - timedelta(days=i)).isoformat(),
+                'source': 'manual',
+            }
+            for i in range(rows)
+        ]
+
+
+class _QueryCounter:
+    # counts statements without keeping them (connection.queries caps at 9000)
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
@@ -0,0 +1,70 @@
+import asyncio
+import statistics
+import time
+
+import httpx
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        'Fire concurrent requests at a running server and report throughput. '
+        'Run it once against the sync stack and once with ASYNC_VIEWS=True '
+        '(same single worker) to compare.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000/api/metrics/')
+        parser.add_argument('--method', default='GET', choices=['GET', 'POST'])
+        parser.add_argument('--body', default='{}', help='JSON body for POST')
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--timeout', type=float, default=60)
+
+    def handle(self, *args, **options):
+        results = asyncio.run(self._run(options))
+        latencies = sorted(r[1] for r in results)
+        elapsed = results.elapsed
+        failed = sum(1 for status, _ in results if status is None or status >= 400)
+
+        self.stdout.write(f"{options['method']} {options['url']}")
+        self.stdout.write(
+            f"{len(results)} requests, concurrency {options['concurrency']}, "
+            f"{failed} failed, {elapsed:.2f}s"
+        )
+        self.stdout.write(f'throughput: {len(results) / elapsed:.1f} req/s')
+        self.stdout.write(
+            'latency ms: p50 {:.0f}  p95 {:.0f}  max {:.0f}'.format(
+                statistics.median(latencies) * 1000,
+                latencies[int(len(latencies) * 0.95) - 1] * 1000,
+                latencies[-1] * 1000,
+            )
+        )
+
+    async def _run(self, options):
+        limits = httpx.Limits(max_connections=options['concurrency'])
+        semaphore = asyncio.Semaphore(options['concurrency'])
+
+        async with httpx.AsyncClient(limits=limits, timeout=options['timeout']) as client:
+            async def one():
+                async with semaphore:
+                    start = time.perf_counter()
+                    try:
+                        response = await client.request(
+                            options['method'], options['url'],
+                            content=options['body'] if options['method'] == 'POST' else None,
+                            headers={'Content-Type': 'application/json'},
+                        )
+                        status = response.status_code
+                    except httpx.HTTPError:
+                        status = None
+                    return status, time.perf_counter() - start
+
+            started = time.perf_counter()
+            results = _Results(await asyncio.gather(*(one() for _ in range(options['requests']))))
+            results.elapsed = time.perf_counter() - started
+        return results
+
+
+class _Results(list):
+    elapsed = 0.0
@@ -0,0 +1,115 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from api.models import UserProfile
+from api.services import backfill, rate_limit
+from api.services.sync_service import HEARTRATE, METRICS, WORKOUTS
+
+
+class Command(BaseCommand):
+    help = (
+        'Load Oura history back to --since for connected users. Progress is '
+        'checkpointed per date chunk, so re-running the same command resumes it'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=date.fromisoformat, required=True,
+                            help='first day to load (YYYY-MM-DD)')
+        parser.add_argument('--until', type=date.fromisoformat, default=None,
+                            help='last day to load (default: today)')
+        parser.add_argument('--user', help='username (default: every connected user)')
+        parser.add_argument('--workers', type=int, default=4,
+                            help='chunks fetched in parallel')
+        parser.add_argument('--chunk-days', type=int, default=settings.OURA_BACKFILL_CHUNK_DAYS,
+                            help='days per checkpointed chunk')
+        parser.add_argument('--rate', type=float, default=None,
+                            help='Oura requests/sec per token (default OURA_RATE_PER_SECOND)')
+
+    def handle(self, *args, **options):
+        since = options['since']
+        until = options['until'] or date.today()
+        if since > until:
+            raise CommandError('--since must be on or before --until')
+        if options['chunk_days'] < 1:
+            raise CommandError('--chunk-days must be at least 1')
+
+        profiles = (
+            UserProfile.objects.exclude(oura_access_token='')
+            .exclude(oura_access_token__isnull=True)
+            .select_related('user')
+        )
+        if options['user']:
+            profiles = profiles.filter(user__username=options['user'])
+        profiles = list(profiles)
+        if not profiles:
+            self.stdout.write('No connected users')
+            return
+
+        jobs = []
+        for profile in profiles:
+            if options['rate']:
+                # leave headroom for the live server, which has its own bucket
+                rate_limit.set_rate(profile.oura_access_token, options['rate'])
+            for chunk in backfill.plan(profile.user, since, until, options['chunk_days']):
+                jobs.append((profile, chunk))
+
+        if not jobs:
+            self.stdout.write(f'Nothing to do, {since}..{until} already backfilled')
+            return
+        self.stdout.write(f'{len(jobs)} chunks to fetch for {len(profiles)} users')
+
+        started = time.monotonic()
+        totals = {'ok': 0, 'failed': 0, METRICS: 0, WORKOUTS: 0, HEARTRATE: 0}
+        touched = {}
+        pool = ThreadPoolExecutor(max_workers=max(options['workers'], 1))
+        try:
+            futures = {pool.submit(self.run_chunk, job): job for job in jobs}
+            for future in as_completed(futures):
+                profile, chunk = futures[future]
+                rows = future.result()
+                if rows is None:
+                    totals['failed'] += 1
+                    continue
+                totals['ok'] += 1
+                totals[chunk.endpoint] += rows
+                touched[profile.user.id] = profile.user
+        except KeyboardInterrupt:
+            # done chunks are already checkpointed; in-flight ones just run again next time
+            pool.shutdown(wait=True, cancel_futures=True)
+            self.stderr.write('Interrupted - re-run the same command to resume')
+            raise
+        finally:
+            pool.shutdown(wait=True)
+
+        for user in touched.values():
+            backfill.finish(user, since)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"Backfilled {totals['ok']}/{len(jobs)} chunks ({totals[METRICS]} days, "
+            f"{totals[WORKOUTS]} workouts, {totals[HEARTRATE]} heart-rate days) in {elapsed:.1f}s"
+        )
+        if totals['failed']:
+            self.stderr.write(f"{totals['failed']} chunks failed - re-run the same command to retry them")
+
+    def run_chunk(self, job):
+        profile, chunk = job
+        try:
+            rows = backfill.run_chunk(chunk, profile.oura_access_token)
+            self.stdout.write(
+                f'{profile.user.username}: {chunk.endpoint} {chunk.start_date}..{chunk.end_date} ({rows})'
+            )
+            return rows
+        except Exception as e:
+            self.stderr.write(
+                f'{profile.user.username}: {chunk.endpoint} {chunk.start_date}..{chunk.end_date} failed: {e}'
+            )
+            return None
+        finally:
+            # each pool thread has its own DB connection
+            connections.close_all()
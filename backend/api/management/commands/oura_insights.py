@@ -0,0 +1,66 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api.services import insights, single_flight
+
+
+class Command(BaseCommand):
+    help = (
+        'Precompute coach summaries and trend insights for users whose metrics '
+        'changed, so the endpoints serve them without waiting on the LLM'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.INSIGHT_BATCH_WORKERS,
+                            help='LLM calls in flight at once')
+        parser.add_argument('--user', help='username (default: everyone with metrics)')
+        parser.add_argument('--all', action='store_true',
+                            help='check every user, not just ones with newer metrics')
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options['user']:
+            users = users.filter(username=options['user'])
+        if not options['all']:
+            users = insights.changed_users(users)
+        users = list(users.filter(metrics__isnull=False).distinct())
+
+        # one job per (user, insight type) that's actually out of date
+        jobs = []
+        for user in users:
+            metrics_data = insights.recent_metrics(user)
+            fingerprint = insights.metrics_fingerprint(metrics_data)
+            for insight_type in insights.INSIGHT_TYPES:
+                if insights.precomputed(user, insight_type, fingerprint) is None:
+                    jobs.append((user, insight_type, metrics_data, fingerprint))
+
+        if not jobs:
+            self.stdout.write('All insights up to date')
+            return
+
+        # bounded: at most `workers` LLM requests open against the shared client
+        with ThreadPoolExecutor(max_workers=max(options['workers'], 1)) as pool:
+            results = list(pool.map(self.generate, jobs))
+
+        failed = sum(1 for ok in results if not ok)
+        self.stdout.write(f'Generated {len(jobs) - failed}/{len(jobs)} insights for {len(users)} users')
+
+    def generate(self, job):
+        user, insight_type, metrics_data, fingerprint = job
+        try:
+            # same key as the views, so a request arriving mid-batch waits for
+            # this generation instead of starting its own
+            single_flight.do(f'{insight_type}:{user.id}', lambda: insights.generate(
+                user, insight_type, metrics_data, fingerprint
+            ))
+            self.stdout.write(f'{user.username}: {insight_type}')
+            return True
+        except Exception as e:
+            self.stderr.write(f'{user.username}: {insight_type} failed: {e}')
+            return False
+        finally:
+            connections.close_all()
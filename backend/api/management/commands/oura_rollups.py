@@ -0,0 +1,22 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from api.models import OuraMetric
+from api.services import rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the DailyStatistic rolling-window table from existing OuraMetric rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='username (default: everyone with metrics)')
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(metrics__isnull=False).distinct()
+        if options['user']:
+            users = users.filter(username=options['user'])
+
+        for user in users:
+            first_day = OuraMetric.objects.filter(user=user).order_by('date').values_list('date', flat=True).first()
+            written = rollups.refresh(user, first_day)
+            self.stdout.write(f'{user.username}: {written} rollup rows')
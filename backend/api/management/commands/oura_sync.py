@@ -0,0 +1,101 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api.models import UserProfile
+from api.services import sync_service, webhooks
+
+
+class Command(BaseCommand):
+    help = 'Keep Oura data fresh for every connected user so the views only read the DB'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4,
+                            help='users synced in parallel')
+        parser.add_argument('--interval', type=int, default=None,
+                            help='seconds between full runs (default OURA_SYNC_INTERVAL, '
+                                 'or OURA_WEBHOOK_POLL_INTERVAL with webhooks on)')
+        parser.add_argument('--days', type=int, default=30,
+                            help='window for users that have never been synced')
+        parser.add_argument('--once', action='store_true',
+                            help='do a single pass and exit (for cron)')
+        parser.add_argument('--queue-only', action='store_true',
+                            help='only run webhook refreshes, no full sync')
+
+    def handle(self, *args, **options):
+        self.days = options['days']
+        interval = options['interval']
+        if interval is None:
+            # with webhooks the full pass is just a safety net for missed events
+            interval = settings.OURA_WEBHOOK_POLL_INTERVAL if settings.OURA_WEBHOOKS_ENABLED else settings.OURA_SYNC_INTERVAL
+
+        next_run = time.monotonic()
+        while True:
+            if not options['queue_only'] and time.monotonic() >= next_run:
+                next_run = time.monotonic() + interval
+                self.run_once(options['workers'])
+            self.drain_queue()
+
+            if options['once']:
+                break
+            # webhook refreshes go out every QUEUE_INTERVAL, full runs when they're due
+            wake = time.monotonic() + settings.OURA_SYNC_QUEUE_INTERVAL
+            if not options['queue_only']:
+                wake = min(wake, next_run)
+            time.sleep(max(wake - time.monotonic(), 0))
+
+    def drain_queue(self):
+        refreshed, skipped, failed = webhooks.drain(report=self.stderr.write)
+        if refreshed or skipped or failed:
+            self.stdout.write(f'Webhook refreshes: {refreshed} done, {skipped} deferred, {failed} failed')
+
+    def run_once(self, workers):
+        profiles = list(
+            UserProfile.objects.exclude(oura_access_token='')
+            .exclude(oura_access_token__isnull=True)
+            .select_related('user')
+        )
+        if not profiles:
+            self.stdout.write('No connected users')
+            return
+
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+            results = list(pool.map(self.sync_user, profiles))
+
+        synced = sum(1 for ok in results if ok)
+        skipped = sum(1 for ok in results if ok is None)
+        summary = f'Synced {synced}/{len(profiles)} users'
+        if skipped:
+            summary += f' ({skipped} skipped, already syncing)'
+        self.stdout.write(summary)
+
+    def sync_user(self, profile):
+        """True if synced, None if skipped (a view held a lock), False on error"""
+        user = profile.user
+        try:
+            # wait=0: if a view is already syncing this user just skip them
+            days = sync_service.sync_metrics(user, profile.oura_access_token, days=self.days)
+            workouts = sync_service.sync_workouts(user, profile.oura_access_token, days=self.days)
+            hr_days = sync_service.sync_heartrate(user, profile.oura_access_token, days=self.days)
+        except Exception as e:
+            self.stderr.write(f'{user.username}: sync failed: {e}')
+            return False
+        finally:
+            # each pool thread has its own DB connection
+            connections.close_all()
+
+        # (data set, rows, unit) - rows is None when another sync held that lock
+        results = [('metrics', days, 'days'), ('workouts', workouts, 'workouts'),
+                   ('heart rate', hr_days, 'heart-rate days')]
+        busy = [name for name, count, _ in results if count is None]
+        done = ', '.join(f'{count} {unit}' for _, count, unit in results if count is not None)
+        if busy:
+            # the next run picks them up
+            self.stdout.write(f"{user.username}: skipped {', '.join(busy)} (sync already running)"
+                              + (f'; {done}' if done else ''))
+            return None
+        self.stdout.write(f'{user.username}: {done}')
+        return True
@@ -0,0 +1,84 @@
+import json
+import time
+import uuid
+from datetime import date, datetime, time as dt_time, timedelta, timezone as dt_timezone
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import UserProfile
+from api.services import webhooks
+
+
+class Command(BaseCommand):
+    help = (
+        'Local stand-in for Oura: posts signed sample webhook events (or the '
+        'subscription challenge) to a running server'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000/api/oura/webhook/')
+        parser.add_argument('--user', help='username to send events for (default: first linked user)')
+        parser.add_argument('--data-type', default='daily_readiness', choices=list(webhooks.DATA_TYPES))
+        parser.add_argument('--event-type', default='update', choices=list(webhooks.EVENT_TYPES))
+        parser.add_argument('--day', type=date.fromisoformat, default=None,
+                            help='day the event is about (default: today)')
+        parser.add_argument('--count', type=int, default=1,
+                            help='events to send, one per day going back from --day')
+        parser.add_argument('--object-id', help='document id (e.g. a workout id for deletes)')
+        parser.add_argument('--challenge', action='store_true',
+                            help='send the subscription verification GET instead')
+        parser.add_argument('--bad-signature', action='store_true',
+                            help='sign with the wrong secret (should get a 401)')
+        parser.add_argument('--drain', action='store_true',
+                            help='run the queued refreshes afterwards, like oura_sync would')
+
+    def handle(self, *args, **options):
+        if options['challenge']:
+            return self.challenge(options['url'])
+
+        if not settings.OURA_CLIENT_SECRET:
+            raise CommandError('Set OURA_CLIENT_SECRET - events are signed with it')
+
+        profiles = UserProfile.objects.exclude(oura_user_id='').select_related('user')
+        if options['user']:
+            profiles = profiles.filter(user__username=options['user'])
+        profile = profiles.first()
+        if profile is None:
+            raise CommandError('No user with an oura_user_id (run oura_webhooks link)')
+
+        day = options['day'] or date.today()
+        for i in range(options['count']):
+            event_day = day - timedelta(days=i)
+            self.post(options['url'], {
+                'event_type': options['event_type'],
+                'data_type': options['data_type'],
+                'object_id': options['object_id'] or uuid.uuid4().hex,
+                # mid-morning UTC on the day, like a real sync from the app
+                'event_time': datetime.combine(event_day, dt_time(9), dt_timezone.utc).isoformat(),
+                'user_id': profile.oura_user_id,
+            }, options['bad_signature'])
+
+        if options['drain']:
+            refreshed, skipped, failed = webhooks.drain(report=self.stderr.write)
+            self.stdout.write(f'Drained: {refreshed} refreshed, {skipped} deferred, {failed} failed')
+
+    def post(self, url, event, bad_signature=False):
+        body = json.dumps(event).encode()
+        timestamp = str(int(time.time()))
+        secret = 'not-the-secret' if bad_signature else None
+        response = requests.post(url, data=body, timeout=10, headers={
+            'Content-Type': 'application/json',
+            'x-oura-timestamp': timestamp,
+            'x-oura-signature': webhooks.sign(body, timestamp, secret),
+        })
+        self.stdout.write(f"{event['data_type']}/{event['event_type']} {event['event_time'][:10]}: "
+                          f'{response.status_code} {response.text}')
+
+    def challenge(self, url):
+        response = requests.get(url, timeout=10, params={
+            'verification_token': settings.OURA_WEBHOOK_VERIFICATION_TOKEN,
+            'challenge': uuid.uuid4().hex,
+        })
+        self.stdout.write(f'challenge: {response.status_code} {response.text}')
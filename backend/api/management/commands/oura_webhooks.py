@@ -0,0 +1,86 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import UserProfile
+from api.services import webhooks
+from api.services.oura_service import OuraService
+
+
+class Command(BaseCommand):
+    help = (
+        'Manage Oura webhook subscriptions (list/subscribe/renew/unsubscribe) and '
+        'link connected users to their Oura user id so events can be routed'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['list', 'subscribe', 'renew', 'unsubscribe', 'link'])
+        parser.add_argument('--callback-url',
+                            help='public URL of /api/oura/webhook/ (subscribe)')
+        parser.add_argument('--data-types', nargs='+', default=list(webhooks.DATA_TYPES),
+                            choices=list(webhooks.DATA_TYPES))
+        parser.add_argument('--event-types', nargs='+', default=list(webhooks.EVENT_TYPES),
+                            choices=list(webhooks.EVENT_TYPES))
+        parser.add_argument('--id', dest='ids', nargs='+',
+                            help='subscription ids (renew/unsubscribe, default: all)')
+
+    def handle(self, *args, **options):
+        action = options['action']
+        if action == 'link':
+            return self.link()
+
+        if not settings.OURA_CLIENT_ID or not settings.OURA_CLIENT_SECRET:
+            raise CommandError('Set OURA_CLIENT_ID and OURA_CLIENT_SECRET first')
+
+        if action == 'list':
+            for sub in webhooks.list_subscriptions():
+                self.stdout.write(
+                    f"{sub.get('id')}  {sub.get('data_type')}/{sub.get('event_type')}  "
+                    f"{sub.get('callback_url')}  expires {sub.get('expiration_time')}"
+                )
+        elif action == 'subscribe':
+            self.subscribe(options)
+        else:
+            ids = options['ids'] or [sub['id'] for sub in webhooks.list_subscriptions()]
+            call = webhooks.renew if action == 'renew' else webhooks.unsubscribe
+            for subscription_id in ids:
+                call(subscription_id)
+                self.stdout.write(f'{action}: {subscription_id}')
+
+    def subscribe(self, options):
+        callback_url = options['callback_url']
+        if not callback_url:
+            raise CommandError('--callback-url is required to subscribe')
+        if not settings.OURA_WEBHOOK_VERIFICATION_TOKEN:
+            raise CommandError('Set OURA_WEBHOOK_VERIFICATION_TOKEN first (Oura echoes it to the callback)')
+
+        # safe to re-run: skip pairs that already point at this callback
+        existing = {
+            (sub.get('data_type'), sub.get('event_type'))
+            for sub in webhooks.list_subscriptions()
+            if sub.get('callback_url') == callback_url
+        }
+        for data_type in options['data_types']:
+            for event_type in options['event_types']:
+                if (data_type, event_type) in existing:
+                    self.stdout.write(f'{data_type}/{event_type}: already subscribed')
+                    continue
+                sub = webhooks.subscribe(callback_url, data_type, event_type)
+                self.stdout.write(f"{data_type}/{event_type}: subscribed ({sub.get('id')})")
+
+    def link(self):
+        profiles = (
+            UserProfile.objects.exclude(oura_access_token='')
+            .exclude(oura_access_token__isnull=True)
+            .filter(oura_user_id='')
+            .select_related('user')
+        )
+        linked = 0
+        for profile in profiles:
+            try:
+                profile.oura_user_id = OuraService(profile.oura_access_token).fetch_personal_info()['id']
+            except Exception as e:
+                self.stderr.write(f'{profile.user.username}: personal_info failed: {e}')
+                continue
+            profile.save(update_fields=['oura_user_id'])
+            linked += 1
+        self.stdout.write(f'Linked {linked} users')
@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-18 08:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_syncstate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='syncstate',
+            name='locked_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
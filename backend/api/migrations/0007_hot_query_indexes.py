@@ -0,0 +1,23 @@
+# Generated by Django 5.0 on 2026-10-18 08:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_dailystatistic'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='aiinsight',
+            index=models.Index(fields=['user', 'insight_type', '-created_at'], name='insight_user_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workout',
+            index=models.Index(fields=['user', '-day', '-id'], name='workout_user_day_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-18 08:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_llmresponse'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aiinsight',
+            name='metrics_fingerprint',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
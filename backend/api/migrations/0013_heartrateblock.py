@@ -0,0 +1,34 @@
+# Generated by Django 5.0 on 2026-10-18 09:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_webhook_sync_requests'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HeartRateBlock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('samples', models.PositiveIntegerField()),
+                ('bpm_sum', models.PositiveIntegerField()),
+                ('min_bpm', models.PositiveSmallIntegerField()),
+                ('max_bpm', models.PositiveSmallIntegerField()),
+                ('offsets', models.BinaryField()),
+                ('bpm', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='heartrate_blocks', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'day')},
+            },
+        ),
+    ]
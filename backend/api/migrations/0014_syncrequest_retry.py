@@ -0,0 +1,23 @@
+# Generated by Django 5.0 on 2026-10-18 09:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_heartrateblock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='syncrequest',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='syncrequest',
+            name='retry_after',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
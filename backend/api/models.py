@@ -40,15 +40,122 @@ class OuraMetric(models.Model):
         return f"{self.user.username} - {self.date}"
 
 
+class DailyStatistic(models.Model):
+    """
+    Rolling-window stats for one user/day/window, e.g. the 30 days ending on `date`.
+    Recomputed from OuraMetric on every upsert so summaries are a single row lookup.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_statistics')
+    date = models.DateField()  # last day of the window
+    window = models.PositiveSmallIntegerField()  # in days
+    # {metric: {mean, std, min, max, count, delta}} - delta is vs the previous window
+    stats = models.JSONField(default=dict, blank=True)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['user', 'date', 'window']
+        ordering = ['-date', 'window']
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.window}d ending {self.date}"
+
+
+class HeartRateBlock(models.Model):
+    """
+    One user's heart-rate samples for one UTC day, packed into two binary
+    columns instead of a row per sample (~300 a day at Oura's 5 minutes,
+    more during workouts). Encoding lives in services/heartrate.py.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='heartrate_blocks')
+    day = models.DateField()  # UTC
+    samples = models.PositiveIntegerField()
+    # per-day summary so coarse charts never have to unpack the arrays
+    bpm_sum = models.PositiveIntegerField()
+    min_bpm = models.PositiveSmallIntegerField()
+    max_bpm = models.PositiveSmallIntegerField()
+    offsets = models.BinaryField()  # seconds since midnight, delta-encoded int32, zlib
+    bpm = models.BinaryField()  # delta-encoded int16, zlib
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['user', 'day']
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.day} ({self.samples} samples)"
+
+
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     oura_access_token = models.CharField(max_length=500, blank=True)
     token_created_at = models.DateTimeField(null=True, blank=True)
+    # Oura's id for the account (personal_info) - webhook events only carry this
+    oura_user_id = models.CharField(max_length=100, blank=True, db_index=True)
     
     def __str__(self):
         return f"{self.user.username}'s profile"
 
 
+class SyncState(models.Model):
+    """High-water mark per user and Oura data set so refreshes only pull new days"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sync_states')
+    endpoint = models.CharField(max_length=50)  # 'metrics' (the 4 daily endpoints) or 'workout'
+    last_synced_day = models.DateField(null=True, blank=True)  # last day we fetched through
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+    # set while a sync is running so the worker and ?force=true don't overlap
+    locked_until = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        unique_together = ['user', 'endpoint']
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.endpoint} @ {self.last_synced_day}"
+
+
+class SyncRequest(models.Model):
+    """
+    A day of Oura data to re-fetch because a webhook said it changed.
+    One row per user/data set/day however many events arrive; oura_sync drains them.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sync_requests')
+    endpoint = models.CharField(max_length=50)  # same values as SyncState.endpoint
+    day = models.DateField()
+    # bumped by every event for the same day, so one arriving mid-fetch isn't lost
+    requested_at = models.DateTimeField()
+    # failed refreshes back off; after webhooks.MAX_ATTEMPTS the rows are dropped
+    attempts = models.PositiveIntegerField(default=0)
+    retry_after = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        unique_together = ['user', 'endpoint', 'day']
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.endpoint} {self.day}"
+
+
+class BackfillChunk(models.Model):
+    """One date slice of an oura_backfill run. Done chunks are skipped when a run resumes."""
+    PENDING = 'pending'
+    DONE = 'done'
+    FAILED = 'failed'
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='backfill_chunks')
+    endpoint = models.CharField(max_length=50)  # same values as SyncState.endpoint
+    start_date = models.DateField()
+    end_date = models.DateField()
+    status = models.CharField(max_length=10, default=PENDING)
+    rows = models.PositiveIntegerField(default=0)  # days / workouts Oura sent back
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['user', 'endpoint', 'start_date', 'end_date']
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.endpoint} {self.start_date}..{self.end_date} ({self.status})"
+
+
 class Workout(models.Model):
     """Stores workout sessions from Oura Ring"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='workouts')
@@ -66,6 +173,10 @@ class Workout(models.Model):
     
     class Meta:
         ordering = ['-day', '-start_datetime']
+        indexes = [
+            # WorkoutsView: filter(user=...).order_by('-day')
+            models.Index(fields=['user', '-day', '-id'], name='workout_user_day_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.activity} on {self.day}"
@@ -85,7 +196,58 @@ class AIInsight(models.Model):
     insight_type = models.CharField(max_length=50)  # 'coach_summary', 'trend', etc
     explanation = models.TextField(blank=True)
     suggestions = models.JSONField(default=list, blank=True)
+    # hash of the metrics the insight was generated from - still current while it matches
+    metrics_fingerprint = models.CharField(max_length=64, blank=True, default='')
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # CoachSummaryView: latest insight of a type for a user
+            models.Index(fields=['user', 'insight_type', '-created_at'], name='insight_user_type_created_idx'),
+        ]
+
+
+class LLMResponse(models.Model):
+    """
+    Cached LLM completions keyed by a hash of model + messages + sampling params.
+    Identical prompts (same metrics, same question) reuse the stored answer.
+    """
+    fingerprint = models.CharField(max_length=64, unique=True)  # sha256 hex
+    model = models.CharField(max_length=100)
+    content = models.TextField()
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True)  # for LRU eviction
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='llmresponse_created_idx'),
+            models.Index(fields=['last_used_at'], name='llmresponse_last_used_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.model} {self.fingerprint[:12]} ({self.hits} hits)"
+
+
+class LLMCall(models.Model):
+    """One OpenAI request (or LLM cache hit): tokens, latency, where it came from"""
+    kind = models.CharField(max_length=50)  # 'coach_summary', 'trend_insight', 'chat', 'chat_stream'
+    model = models.CharField(max_length=100)
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    completion_tokens = models.PositiveIntegerField(default=0)
+    # True when usage came from our own count (streaming / no usage block)
+    estimated = models.BooleanField(default=False)
+    cached = models.BooleanField(default=False)  # served from LLMResponse, nothing billed
+    latency_ms = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['kind', 'created_at'], name='llmcall_kind_created_idx'),
+            models.Index(fields=['created_at'], name='llmcall_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} {self.prompt_tokens}+{self.completion_tokens} tokens, {self.latency_ms}ms"
@@ -0,0 +1,36 @@
+"""
+orjson-backed JSON renderer.
+
+Drop-in for rest_framework.renderers.JSONRenderer: same media type, same
+compact UTF-8 output. orjson handles dates/datetimes/UUIDs natively; anything
+else (Decimal, lazy strings, ...) goes through DRF's own encoder. Falls back
+to the stock renderer if orjson isn't installed or an indent was asked for.
+"""
+import importlib.util
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+if importlib.util.find_spec('orjson') is not None:
+    import orjson
+else:
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # OPT_UTC_Z: "...Z" instead of "+00:00", same as DRF
+        return orjson.dumps(data, default=_fallback, option=orjson.OPT_UTC_Z)
+
+
+_drf_encoder = JSONEncoder()
+
+
+def _fallback(obj):
+    return _drf_encoder.default(obj)
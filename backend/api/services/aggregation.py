@@ -0,0 +1,152 @@
+"""
+One-pass aggregation over daily metric rows.
+
+Shared by /api/metrics/summary/ and the OpenAI prompt builders so the
+averages/trends the user sees and the ones the coach talks about are the
+same numbers. Rows are dicts keyed like OuraMetric (serializer output or
+.values()), newest first - the order every view already queries in.
+"""
+from datetime import datetime
+
+from django.utils import timezone
+
+from .dates import as_date
+
+
+AVG_FIELDS = (
+    'readiness_score', 'sleep_score', 'activity_score',
+    'sleep_duration', 'deep_sleep', 'rem_sleep',
+    'hrv', 'resting_hr', 'steps', 'active_calories',
+)
+TREND_FIELDS = ('readiness_score', 'sleep_score', 'activity_score', 'hrv')
+ROLLING_WINDOWS = (7, 30, 90)
+
+# a change smaller than this (score points) counts as "stable"
+TREND_THRESHOLD = 2
+
+
+class _Mean:
+    __slots__ = ('total', 'count')
+
+    def __init__(self):
+        self.total = 0.0
+        self.count = 0
+
+    def add(self, value):
+        if value is not None:
+            self.total += value
+            self.count += 1
+
+    @property
+    def value(self):
+        return self.total / self.count if self.count else None
+
+
+def summarize(rows, window=7, rolling=ROLLING_WINDOWS, tz=None):
+    """
+    Averages, trends and patterns for the last `window` days plus rolling
+    means for each of `rolling`, in a single pass over newest-first rows.
+    Missing values are skipped rather than counted as 0.
+    """
+    tz = tz or timezone.get_current_timezone()
+    horizon = max((window,) + tuple(rolling))
+    newer_half = window - window // 2  # newer half gets the odd day, like len//2 did
+
+    means = {field: _Mean() for field in AVG_FIELDS}
+    rolling_means = {w: {field: _Mean() for field in AVG_FIELDS} for w in rolling}
+    older = {field: _Mean() for field in TREND_FIELDS}
+    newer = {field: _Mean() for field in TREND_FIELDS}
+    bedtime = _Mean()
+
+    latest_day = None
+    latest = None
+    oldest_day = None
+    days = 0
+
+    for row in rows:
+        day = as_date(row['date'])
+        if latest_day is None:
+            latest_day, latest = day, row
+        offset = (latest_day - day).days
+        if offset >= horizon:
+            break  # newest first, so nothing further can be in range
+
+        for w in rolling:
+            if offset < w:
+                acc = rolling_means[w]
+                for field in AVG_FIELDS:
+                    acc[field].add(row.get(field))
+
+        if offset >= window:
+            continue
+
+        days += 1
+        oldest_day = day
+        for field in AVG_FIELDS:
+            means[field].add(row.get(field))
+
+        half = newer if offset < newer_half else older
+        for field in TREND_FIELDS:
+            half[field].add(row.get(field))
+
+        bedtime.add(_bedtime_minutes(row.get('bedtime_start'), tz))
+
+    averages = {field: _round(acc.value) for field, acc in means.items()}
+
+    return {
+        'window': window,
+        'days': days,
+        'start': oldest_day,
+        'end': latest_day,
+        'averages': averages,
+        'rolling': {
+            str(w): {field: _round(acc.value) for field, acc in fields.items()}
+            for w, fields in rolling_means.items()
+        },
+        'trends': {field: _trend(older[field].value, newer[field].value) for field in TREND_FIELDS},
+        'patterns': {
+            'avg_sleep_hours': averages['sleep_duration'],
+            'avg_bedtime': _format_minutes(bedtime.value),
+            'avg_steps': round(averages['steps']) if averages['steps'] is not None else None,
+        },
+        'latest': latest,
+    }
+
+
+def _trend(first, second):
+    if first is None or second is None:
+        return {'first': _round(first), 'second': _round(second), 'change': None, 'direction': 'stable'}
+
+    change = second - first
+    if change > TREND_THRESHOLD:
+        direction = 'improving'
+    elif change < -TREND_THRESHOLD:
+        direction = 'declining'
+    else:
+        direction = 'stable'
+    return {'first': _round(first), 'second': _round(second), 'change': _round(change), 'direction': direction}
+
+
+def _bedtime_minutes(value, tz):
+    """Minutes after midnight, with early-morning bedtimes pushed past 24h so 23:30 and 00:30 average to midnight"""
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    local = value.astimezone(tz)
+    minutes = local.hour * 60 + local.minute
+    if minutes < 12 * 60:
+        minutes += 24 * 60
+    return minutes
+
+
+def _format_minutes(minutes):
+    if minutes is None:
+        return None
+    minutes = round(minutes) % (24 * 60)
+    return f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+
+
+def _round(value):
+    return round(value, 2) if value is not None else None
@@ -0,0 +1,94 @@
+"""
+Historical backfill (manage.py oura_backfill).
+
+The regular sync only ever pulls a 30-day window. A backfill splits
+[since, until] into fixed date chunks per data set and records each one as a
+BackfillChunk. Chunks run in parallel (the per-token rate bucket keeps them
+inside Oura's budget) and are marked done as soon as their rows are written,
+so an interrupted run picks up where it left off.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+
+from ..models import BackfillChunk
+from .oura_service import OuraService
+from .sync_service import HEARTRATE, METRICS, WORKOUTS
+from . import heartrate, persistence, response_cache, rollups
+
+
+ENDPOINTS = (METRICS, WORKOUTS, HEARTRATE)
+
+
+def plan(user, since, until, chunk_days):
+    """
+    Create any missing chunks for the range and return the ones still to do,
+    newest first so recent history shows up before the old years.
+    Re-running with the same since/chunk_days reuses the same chunks.
+    """
+    ranges = list(date_chunks(since, until, chunk_days))
+    BackfillChunk.objects.bulk_create([
+        BackfillChunk(user=user, endpoint=endpoint, start_date=start, end_date=end)
+        for endpoint in ENDPOINTS for start, end in ranges
+    ], ignore_conflicts=True)
+
+    pending = (
+        BackfillChunk.objects.filter(user=user, start_date__gte=since, end_date__lte=until)
+        .exclude(status=BackfillChunk.DONE)
+        .select_related('user')
+        .order_by('-start_date', 'endpoint')
+    )
+    # exact ranges only - chunks left over from a run with another --chunk-days don't count
+    ranges = set(ranges)
+    return [c for c in pending if (c.start_date, c.end_date) in ranges]
+
+
+def date_chunks(since, until, chunk_days):
+    """(start, end) pairs covering since..until inclusive, aligned to since"""
+    step = timedelta(days=chunk_days)
+    start = since
+    while start <= until:
+        end = min(start + step - timedelta(days=1), until)
+        yield start, end
+        start = end + timedelta(days=1)
+
+
+def run_chunk(chunk, access_token):
+    """Fetch + save one chunk and mark it done. Failures are recorded and re-raised."""
+    oura = OuraService(access_token)
+    user = chunk.user
+    BackfillChunk.objects.filter(pk=chunk.pk).update(attempts=chunk.attempts + 1)
+
+    try:
+        if chunk.endpoint == METRICS:
+            # rollups are refreshed once per user by finish(), not per chunk
+            rows = persistence.upsert_metrics_chunks(
+                user,
+                oura.iter_metrics(start_date=chunk.start_date, end_date=chunk.end_date),
+                refresh_rollups=False,
+            )
+        elif chunk.endpoint == HEARTRATE:
+            pages = oura.iter_heartrate(chunk.start_date, chunk.end_date)
+            rows = heartrate.ingest(
+                user, (sample for page in pages for sample in page), chunk.start_date, chunk.end_date
+            )
+        else:
+            rows = persistence.upsert_workouts_chunks(
+                user, oura.iter_workouts(start_date=chunk.start_date, end_date=chunk.end_date)
+            )
+    except Exception as e:
+        BackfillChunk.objects.filter(pk=chunk.pk).update(status=BackfillChunk.FAILED, error=str(e)[:1000])
+        raise
+
+    BackfillChunk.objects.filter(pk=chunk.pk).update(status=BackfillChunk.DONE, rows=rows, error='')
+    return rows
+
+
+def finish(user, since):
+    """After a user's chunks are in: rollups over the new history, drop cached payloads"""
+    with transaction.atomic():
+        rollups.refresh(user, since)
+    response_cache.invalidate(
+        user.id, response_cache.METRICS, response_cache.METRICS_SUMMARY,
+        response_cache.COACH_SUMMARY, response_cache.WORKOUTS, response_cache.HEARTRATE,
+    )
@@ -0,0 +1,17 @@
+"""Date parsing shared by the services (query params, cursors, stored rows)."""
+from datetime import date
+
+
+def parse_day(value, name):
+    """A YYYY-MM-DD query/cursor value as a date, None if empty; ValueError names the param"""
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'{name} must be a YYYY-MM-DD date')
+
+
+def as_date(value):
+    """A date or ISO date string as a date"""
+    return value if isinstance(value, date) else date.fromisoformat(value)
@@ -0,0 +1,144 @@
+"""
+Columnar history export (/api/export/).
+
+The body is NDJSON: a header line, then one line per chunk of rows with
+each field as an array, e.g.
+
+    {"resource": "metrics", "fields": ["date", "hrv"], "chunk_size": 1000}
+    {"rows": 2, "columns": {"date": ["2025-01-01", "2025-01-02"], "hrv": [48, 51]}}
+    {"done": true, "rows": 2}
+
+Rows come off a server-side cursor (.iterator(), or .aiterator() under
+ASGI) one chunk at a time, so memory is one chunk no matter how long the
+history is. A client can append each chunk's arrays onto its own columns
+as they arrive.
+"""
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from ..models import OuraMetric, Workout
+from .dates import parse_day
+from .persistence import METRIC_FIELDS
+
+
+METRICS = 'metrics'
+WORKOUTS = 'workouts'
+
+# exportable columns per resource, and the day column ranges filter on
+RESOURCES = {
+    METRICS: {
+        'model': OuraMetric,
+        'day_field': 'date',
+        'fields': ['date'] + METRIC_FIELDS,
+    },
+    WORKOUTS: {
+        'model': Workout,
+        'day_field': 'day',
+        'fields': [
+            'day', 'activity', 'calories', 'intensity',
+            'start_datetime', 'end_datetime', 'source',
+        ],
+    },
+}
+
+
+def parse_params(params):
+    """
+    (resource, fields, start, end) from the query string.
+    Raises ValueError with a user-facing message on bad input.
+    """
+    resource = params.get('resource', METRICS)
+    if resource not in RESOURCES:
+        raise ValueError(f"resource must be one of: {', '.join(RESOURCES)}")
+    spec = RESOURCES[resource]
+
+    fields = spec['fields']
+    if params.get('fields'):
+        fields = [f.strip() for f in params['fields'].split(',') if f.strip()]
+        unknown = [f for f in fields if f not in spec['fields']]
+        if unknown:
+            raise ValueError(f"unknown fields: {', '.join(unknown)}")
+
+    start = parse_day(params.get('start'), 'start')
+    end = parse_day(params.get('end'), 'end')
+    if start and end and start > end:
+        raise ValueError('start must be on or before end')
+
+    return resource, fields, start, end
+
+
+def queryset(user, resource, fields, start=None, end=None):
+    spec = RESOURCES[resource]
+    day_field = spec['day_field']
+    qs = spec['model'].objects.filter(user=user)
+    if start:
+        qs = qs.filter(**{f'{day_field}__gte': start})
+    if end:
+        qs = qs.filter(**{f'{day_field}__lte': end})
+    # oldest first - it's a time series. values() rather than values_list():
+    # ValuesListIterable isn't lazy, so aiterator() trips over it on Django 5.0
+    return qs.order_by(day_field, 'pk').values(*fields)
+
+
+def body(qs, resource, fields, chunk_size):
+    """The whole response body (header, chunks, footer) off a server-side cursor"""
+    yield header(resource, fields, chunk_size)
+    yield from stream(qs.iterator(chunk_size=chunk_size), fields, chunk_size)
+
+
+async def abody(qs, resource, fields, chunk_size):
+    """body() as an async generator - under ASGI a sync body gets buffered whole"""
+    yield header(resource, fields, chunk_size)
+    async for line in astream(qs.aiterator(chunk_size=chunk_size), fields, chunk_size):
+        yield line
+
+
+def header(resource, fields, chunk_size):
+    return _line({'resource': resource, 'fields': fields, 'chunk_size': chunk_size})
+
+
+def stream(rows, fields, chunk_size):
+    """NDJSON chunk lines for an iterable of row dicts (after header())"""
+    total = 0
+    buffer = []
+    for row in rows:
+        buffer.append(row)
+        if len(buffer) >= chunk_size:
+            total += len(buffer)
+            yield chunk(buffer, fields)
+            buffer = []
+    if buffer:
+        total += len(buffer)
+        yield chunk(buffer, fields)
+    yield footer(total)
+
+
+async def astream(rows, fields, chunk_size):
+    """stream() over an async iterable (QuerySet.aiterator) for the ASGI view"""
+    total = 0
+    buffer = []
+    async for row in rows:
+        buffer.append(row)
+        if len(buffer) >= chunk_size:
+            total += len(buffer)
+            yield chunk(buffer, fields)
+            buffer = []
+    if buffer:
+        total += len(buffer)
+        yield chunk(buffer, fields)
+    yield footer(total)
+
+
+def chunk(rows, fields):
+    # transpose rows into one array per field
+    columns = {field: [row[field] for row in rows] for field in fields}
+    return _line({'rows': len(rows), 'columns': columns})
+
+
+def footer(total):
+    return _line({'done': True, 'rows': total})
+
+
+def _line(obj):
+    return json.dumps(obj, cls=DjangoJSONEncoder, separators=(',', ':')) + '\n'
@@ -0,0 +1,249 @@
+"""
+Heart-rate time series (HeartRateBlock).
+
+Oura's heartrate endpoint returns a sample every 5 minutes (denser during
+workouts) - 100k+ a year per user. Rather than a row per sample, each UTC
+day is one row with two packed arrays:
+
+    offsets  seconds since midnight, delta-encoded int32
+    bpm      delta-encoded int16
+
+both zlib-compressed (consecutive deltas are mostly identical, so a day
+shrinks to a few hundred bytes). Arrays are stored little-endian.
+
+Reads bucket the samples server-side (min/avg/max per bucket), sized so a
+chart gets at most MAX_POINTS points whatever the range: 30 days comes back
+as 360 two-hour points, a few KB. Whole-day buckets come straight from the
+per-day summary columns without unpacking anything.
+"""
+import sys
+import zlib
+from array import array
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from itertools import accumulate
+
+from django.db import transaction
+
+from ..models import HeartRateBlock
+from .dates import parse_day
+
+
+DEFAULT_DAYS = 7
+MAX_DAYS = 366
+MAX_POINTS = 500
+# bucket widths we snap to (seconds), so points line up on the clock
+BUCKETS = (300, 600, 900, 1800, 3600, 7200, 10800, 21600, 43200, 86400, 604800)
+DAY = 86400
+
+# days written per upsert statement
+BATCH_DAYS = 50
+
+
+def ingest(user, samples, start_date=None, end_date=None):
+    """
+    Pack raw Oura samples (any order, any number of pages deep) into day
+    blocks and upsert them a batch at a time. Days outside start_date..end_date
+    are dropped, so a partial edge day can't overwrite a complete block.
+    Returns the number of days written.
+    """
+    written = 0
+    batch = []
+    for day, offsets, bpms in _days(samples):
+        if (start_date and day < start_date) or (end_date and day > end_date):
+            continue
+        batch.append(_block(user, day, offsets, bpms))
+        if len(batch) >= BATCH_DAYS:
+            written += _upsert(batch)
+            batch = []
+    if batch:
+        written += _upsert(batch)
+    return written
+
+
+def encode(offsets, bpms):
+    """(offsets blob, bpm blob) for one day's sorted samples"""
+    return (
+        _pack('i', _deltas(offsets)),
+        _pack('h', _deltas(bpms)),
+    )
+
+
+def decode(offsets_blob, bpm_blob):
+    """(offsets, bpms) back out of a block"""
+    return (
+        list(accumulate(_unpack('i', offsets_blob))),
+        list(accumulate(_unpack('h', bpm_blob))),
+    )
+
+
+def parse_params(params):
+    """
+    {'start', 'end', 'bucket'} from the query string (days inclusive, UTC).
+    Default is the last 7 days with an automatic bucket.
+    Raises ValueError with a user-facing message on bad input.
+    """
+    end = parse_day(params.get('end'), 'end') or datetime.now(dt_timezone.utc).date()
+    start = parse_day(params.get('start'), 'start') or end - timedelta(days=DEFAULT_DAYS - 1)
+    if start > end:
+        raise ValueError('start must be on or before end')
+    if (end - start).days + 1 > MAX_DAYS:
+        raise ValueError(f'at most {MAX_DAYS} days per request')
+
+    bucket = None
+    if params.get('bucket'):
+        try:
+            bucket = int(params['bucket'])
+        except ValueError:
+            raise ValueError('bucket must be a number of seconds')
+        if bucket < BUCKETS[0]:
+            raise ValueError(f'bucket must be at least {BUCKETS[0]} seconds')
+    return {'start': start, 'end': end, 'bucket': bucket}
+
+
+def series(user, start, end, bucket=None):
+    """
+    Downsampled heart rate for days start..end. Columnar and dense: entry i
+    of min/avg/max covers t0 + i * bucket_seconds (unix time), None where
+    the ring recorded nothing - no per-point timestamps to send.
+    """
+    bucket = pick_bucket(start, end, bucket)
+    origin = _epoch(start)
+    stats = {}  # bucket index -> [count, sum, min, max]
+    total = 0
+
+    qs = HeartRateBlock.objects.filter(user=user, day__gte=start, day__lte=end).order_by('day')
+    if bucket % DAY == 0:
+        # whole-day buckets: the per-day summary is enough, no blobs read at all
+        for row in qs.values('day', 'samples', 'bpm_sum', 'min_bpm', 'max_bpm'):
+            total += row['samples']
+            index = (_epoch(row['day']) - origin) // bucket
+            _merge_stats(stats, index, row['samples'], row['bpm_sum'], row['min_bpm'], row['max_bpm'])
+    else:
+        for row in qs.values('day', 'offsets', 'bpm').iterator(chunk_size=BATCH_DAYS):
+            offsets, bpms = decode(row['offsets'], row['bpm'])
+            total += len(bpms)
+            day_start = _epoch(row['day']) - origin
+            for offset, bpm in zip(offsets, bpms):
+                index = (day_start + offset) // bucket
+                entry = stats.get(index)
+                if entry is None:
+                    stats[index] = [1, bpm, bpm, bpm]
+                else:
+                    entry[0] += 1
+                    entry[1] += bpm
+                    if bpm < entry[2]:
+                        entry[2] = bpm
+                    if bpm > entry[3]:
+                        entry[3] = bpm
+
+    size = -(-(_epoch(end) + DAY - origin) // bucket)
+    lows, avgs, highs = [None] * size, [None] * size, [None] * size
+    for index, (count, bpm_sum, low, high) in stats.items():
+        lows[index] = low
+        avgs[index] = round(bpm_sum / count, 1)
+        highs[index] = high
+
+    return {
+        'start': start, 'end': end, 't0': origin, 'bucket_seconds': bucket,
+        'samples': total, 'min': lows, 'avg': avgs, 'max': highs,
+    }
+
+
+def pick_bucket(start, end, requested=None):
+    """Smallest snap width that keeps the range under MAX_POINTS (or the requested one if wider)"""
+    span = ((end - start).days + 1) * DAY
+    floor = max(requested or 0, -(-span // MAX_POINTS))
+    for width in BUCKETS:
+        if width >= floor:
+            return width
+    return max(floor, BUCKETS[-1])
+
+
+def _days(samples):
+    """
+    (day, offsets, bpms) per UTC day, oldest first. Samples are grouped by
+    day before packing, so a day that turns up again further down the input
+    (pages out of order) is merged instead of emitted twice - two rows for
+    one day in a batch would make the upsert keep only the later one, and
+    Postgres rejects the batch outright.
+    """
+    by_day = {}
+    for sample in samples:
+        when = _parse_timestamp(sample['timestamp'])
+        by_offset = by_day.setdefault(when.date(), {})
+        offset = when.hour * 3600 + when.minute * 60 + when.second
+        # same second twice (overlapping pages) - keep the later one
+        by_offset[offset] = int(sample['bpm'])
+    for day in sorted(by_day):
+        yield _sorted_day(day, by_day.pop(day))
+
+
+def _sorted_day(day, by_offset):
+    offsets = sorted(by_offset)
+    return day, offsets, [by_offset[o] for o in offsets]
+
+
+def _block(user, day, offsets, bpms):
+    offsets_blob, bpm_blob = encode(offsets, bpms)
+    return HeartRateBlock(
+        user=user, day=day, samples=len(bpms),
+        bpm_sum=sum(bpms), min_bpm=min(bpms), max_bpm=max(bpms),
+        offsets=offsets_blob, bpm=bpm_blob,
+    )
+
+
+def _upsert(blocks):
+    with transaction.atomic():
+        HeartRateBlock.objects.bulk_create(
+            blocks,
+            update_conflicts=True,
+            unique_fields=['user', 'day'],
+            update_fields=['samples', 'bpm_sum', 'min_bpm', 'max_bpm', 'offsets', 'bpm', 'updated_at'],
+        )
+    return len(blocks)
+
+
+def _merge_stats(stats, index, count, bpm_sum, low, high):
+    entry = stats.get(index)
+    if entry is None:
+        stats[index] = [count, bpm_sum, low, high]
+    else:
+        entry[0] += count
+        entry[1] += bpm_sum
+        entry[2] = min(entry[2], low)
+        entry[3] = max(entry[3], high)
+
+
+def _deltas(values):
+    previous = 0
+    out = []
+    for value in values:
+        out.append(value - previous)
+        previous = value
+    return out
+
+
+def _pack(typecode, values):
+    packed = array(typecode, values)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return zlib.compress(packed.tobytes())
+
+
+def _unpack(typecode, blob):
+    packed = array(typecode)
+    packed.frombytes(zlib.decompress(bytes(blob)))  # memoryview on Postgres
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed
+
+
+def _parse_timestamp(value):
+    when = datetime.fromisoformat(value)
+    if when.tzinfo is None:
+        return when.replace(tzinfo=dt_timezone.utc)
+    return when.astimezone(dt_timezone.utc)
+
+
+def _epoch(day):
+    return int(datetime.combine(day, time(0), dt_timezone.utc).timestamp())
@@ -0,0 +1,202 @@
+"""
+Process-wide HTTP clients shared by the service classes.
+
+Services get built per request, so anything holding sockets lives here
+instead of on the instance - otherwise every view call pays a fresh TCP+TLS
+handshake.
+
+Clients are created lazily on first use. close_all() is the worker
+shutdown hook: ApiConfig.ready() registers it at exit, and a process manager
+can also call it explicitly (e.g. gunicorn's worker_exit).
+
+The async clients are per event loop, so only code running on a long-lived
+loop may use them - the ASGI server's (async_views.py, and the streaming
+chat under ASGI). Under WSGI every async_to_sync call gets a fresh loop,
+which would mean a new pool per request; wsgi.py refuses ASYNC_VIEWS for
+that reason. asgi.py closes the loop's clients on lifespan shutdown with
+aclose_loop_clients().
+"""
+import asyncio
+import atexit
+import importlib.util
+import threading
+import weakref
+
+import httpx
+import requests
+from openai import AsyncOpenAI, OpenAI
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+
+_lock = threading.Lock()
+_oura_session = None
+_openai_client = None
+_openai_http = None
+# async clients are tied to the event loop they were created on (one per
+# loop - under ASGI that's one per process)
+_async_openai_clients = weakref.WeakKeyDictionary()
+_async_oura_clients = weakref.WeakKeyDictionary()
+
+
+def get_oura_session():
+    """Shared keep-alive session for the Oura API (safe to use from threads)"""
+    global _oura_session
+    if _oura_session is None:
+        with _lock:
+            if _oura_session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=settings.OURA_POOL_CONNECTIONS,
+                    pool_maxsize=settings.OURA_POOL_MAXSIZE,
+                    # block instead of opening throwaway connections past maxsize
+                    pool_block=True,
+                )
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _oura_session = session
+    return _oura_session
+
+
+def get_async_oura_client():
+    """Shared keep-alive httpx.AsyncClient for the running event loop (async views)"""
+    loop = asyncio.get_running_loop()
+    client = _async_oura_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.OURA_POOL_MAXSIZE,
+                max_keepalive_connections=settings.OURA_POOL_MAXSIZE,
+            ),
+        )
+        _async_oura_clients[loop] = client
+    return client
+
+
+def oura_connection_stats():
+    """
+    Connection reuse counters for the Oura session.
+    requests == connections means nothing is being reused.
+    """
+    stats = {'pools': 0, 'connections_opened': 0, 'requests': 0}
+    session = _oura_session
+    if session is None:
+        return stats
+
+    seen = set()
+    for adapter in session.adapters.values():
+        if id(adapter) in seen:
+            continue
+        seen.add(id(adapter))
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue  # evicted while we were looking
+            stats['pools'] += 1
+            stats['connections_opened'] += pool.num_connections
+            stats['requests'] += pool.num_requests
+
+    stats['reused'] = max(stats['requests'] - stats['connections_opened'], 0)
+    return stats
+
+
+def close_oura_session():
+    global _oura_session
+    with _lock:
+        if _oura_session is not None:
+            _oura_session.close()
+            _oura_session = None
+
+
+def get_openai_client():
+    """Shared OpenAI client over one pooled httpx transport (thread-safe)"""
+    global _openai_client, _openai_http
+    if _openai_client is None:
+        with _lock:
+            if _openai_client is None:
+                http_client = httpx.Client(http2=_http2_enabled(), limits=_openai_limits())
+                try:
+                    # passing our own http_client also dodges the openai/httpx
+                    # `proxies` mismatch the old per-request workaround was for
+                    client = OpenAI(api_key=settings.OPENAI_API_KEY, http_client=http_client)
+                except Exception:
+                    http_client.close()  # e.g. no API key - don't leak the pool
+                    raise
+                _openai_http = http_client
+                _openai_client = client
+    return _openai_client
+
+
+def openai_transport():
+    """The httpx client behind get_openai_client() (None until first use)"""
+    return _openai_http
+
+
+def close_openai_client():
+    global _openai_client, _openai_http
+    with _lock:
+        if _openai_http is not None:
+            _openai_http.close()
+        _openai_client = None
+        _openai_http = None
+
+
+def get_async_openai_client():
+    """Shared AsyncOpenAI client for the running event loop (streaming / async views)"""
+    loop = asyncio.get_running_loop()
+    client = _async_openai_clients.get(loop)
+    if client is None:
+        client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            http_client=httpx.AsyncClient(http2=_http2_enabled(), limits=_openai_limits()),
+        )
+        _async_openai_clients[loop] = client
+    return client
+
+
+async def aclose_loop_clients():
+    """Close the running loop's async clients (ASGI lifespan shutdown)"""
+    loop = asyncio.get_running_loop()
+    openai_client = _async_openai_clients.pop(loop, None)
+    oura_client = _async_oura_clients.pop(loop, None)
+    if openai_client is not None:
+        await openai_client.close()
+    if oura_client is not None:
+        await oura_client.aclose()
+
+
+def close_async_clients():
+    """Close async clients left on loops that are no longer running"""
+    for clients in (_async_openai_clients, _async_oura_clients):
+        for loop, client in list(clients.items()):
+            if loop.is_running():
+                continue  # still serving - aclose_loop_clients() handles it
+            del clients[loop]
+            if not loop.is_closed():
+                close = client.close() if isinstance(client, AsyncOpenAI) else client.aclose()
+                loop.run_until_complete(close)
+            # on a closed loop there's nothing left to await; the sockets go with it
+
+
+def close_all():
+    close_oura_session()
+    close_openai_client()
+    close_async_clients()
+
+
+def register_shutdown():
+    atexit.register(close_all)
+
+
+def _openai_limits():
+    return httpx.Limits(
+        max_connections=settings.OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE,
+        keepalive_expiry=settings.OPENAI_KEEPALIVE_EXPIRY,
+    )
+
+
+def _http2_enabled():
+    # httpx only speaks HTTP/2 with the optional `h2` package installed
+    return settings.OPENAI_HTTP2 and importlib.util.find_spec('h2') is not None
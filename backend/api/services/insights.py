@@ -0,0 +1,117 @@
+"""
+Precomputed coach summaries and trend insights (AIInsight rows).
+
+Every insight stores a fingerprint of the 7 days of metrics it was generated
+from. The views serve the latest insight whose fingerprint matches the
+user's current metrics, whatever its age, and only call the LLM on a miss.
+`manage.py oura_insights` fills those rows ahead of time for everyone whose
+metrics moved.
+"""
+import hashlib
+import json
+
+from asgiref.sync import sync_to_async
+from django.db.models import F, Max, OuterRef, Q, Subquery
+
+from ..models import AIInsight, OuraMetric
+from ..serializers import OuraMetricSerializer
+from .openai_service import OpenAIService
+from . import response_cache
+
+
+COACH_SUMMARY = 'coach_summary'
+TREND_INSIGHT = 'trend_insight'
+INSIGHT_TYPES = (COACH_SUMMARY, TREND_INSIGHT)
+
+# what the prompts look at
+METRICS_DAYS = 7
+
+# response_cache TTL for coach summaries
+COACH_SUMMARY_TTL = 3600
+
+
+def recent_metrics(user):
+    metrics = OuraMetric.objects.filter(user=user).order_by('-date')[:METRICS_DAYS]
+    return OuraMetricSerializer(metrics, many=True).data
+
+
+def metrics_fingerprint(metrics_data):
+    payload = json.dumps(metrics_data, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def precomputed(user, insight_type, fingerprint):
+    """Stored insight for exactly these metrics, or None"""
+    return AIInsight.objects.filter(
+        user=user, insight_type=insight_type, metrics_fingerprint=fingerprint
+    ).values_list('suggestions', flat=True).first()
+
+
+def generate(user, insight_type, metrics_data, fingerprint=None, ai=None, use_cache=True):
+    """
+    Call the LLM and store the result. Returns the insight dict.
+    use_cache=False (force=true) bypasses the LLM completion cache.
+    """
+    ai = ai or OpenAIService()
+    if insight_type == COACH_SUMMARY:
+        result = ai.generate_coach_summary(metrics_data, use_cache=use_cache)
+    else:
+        result = ai.generate_trend_insight(metrics_data, use_cache=use_cache)
+    return _store(user, insight_type, result, metrics_data, fingerprint, ai)
+
+
+async def agenerate(user, insight_type, metrics_data, fingerprint=None, ai=None, use_cache=True):
+    """generate() for the async views"""
+    ai = ai or OpenAIService()
+    if insight_type == COACH_SUMMARY:
+        result = await ai.agenerate_coach_summary(metrics_data, use_cache=use_cache)
+    else:
+        result = await ai.agenerate_trend_insight(metrics_data, use_cache=use_cache)
+    return await sync_to_async(_store)(user, insight_type, result, metrics_data, fingerprint, ai)
+
+
+def changed_users(users):
+    """
+    Users whose metrics were written after their latest insight of some type.
+    Syncs rewrite rows even when nothing changed, so callers still compare
+    fingerprints - this just skips the users nobody has touched.
+    """
+    users = users.annotate(metrics_updated=Max('metrics__updated_at')).filter(
+        metrics_updated__isnull=False
+    )
+    stale = Q()
+    for insight_type in INSIGHT_TYPES:
+        latest = AIInsight.objects.filter(
+            user=OuterRef('pk'), insight_type=insight_type
+        ).exclude(metrics_fingerprint='').order_by('-created_at').values('created_at')[:1]
+        field = f'{insight_type}_at'
+        users = users.annotate(**{field: Subquery(latest)})
+        stale |= Q(**{f'{field}__isnull': True}) | Q(metrics_updated__gt=F(field))
+    return users.filter(stale)
+
+
+def _store(user, insight_type, result, metrics_data, fingerprint, ai):
+    if insight_type == COACH_SUMMARY:
+        fallback = ai._fallback_coach_summary()
+    else:
+        fallback = ai._fallback_trend_insight()
+
+    if fingerprint is None:
+        fingerprint = metrics_fingerprint(metrics_data)
+
+    AIInsight.objects.create(
+        user=user,
+        insight_type=insight_type,
+        explanation='',  # full result lives in suggestions
+        suggestions=result,
+        # the canned fallback (LLM down) shouldn't stick until the metrics change
+        metrics_fingerprint='' if result == fallback else fingerprint,
+    )
+
+    if insight_type == COACH_SUMMARY:
+        # replace whatever the views had cached for this user
+        response_cache.invalidate(user.id, response_cache.COACH_SUMMARY)
+        response_cache.store(
+            response_cache.key(user.id, response_cache.COACH_SUMMARY), result, COACH_SUMMARY_TTL
+        )
+    return result
@@ -0,0 +1,70 @@
+"""
+Content-addressed cache for LLM completions (LLMResponse table).
+
+The key is a sha256 of everything that affects the output - model, every
+message (system + user) and the sampling params - so a hit is only possible
+when the exact same request would have been sent again. Entries expire after
+LLM_CACHE_TTL and the least recently used are evicted past LLM_CACHE_MAX_ENTRIES.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import LLMResponse
+
+
+def fingerprint(model, messages, **params):
+    payload = json.dumps(
+        {'model': model, 'messages': messages, 'params': params},
+        sort_keys=True, ensure_ascii=False, default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def lookup(key):
+    """Cached content or None"""
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+
+    fresh_since = timezone.now() - timedelta(seconds=settings.LLM_CACHE_TTL)
+    content = LLMResponse.objects.filter(
+        fingerprint=key, created_at__gte=fresh_since
+    ).values_list('content', flat=True).first()
+
+    if content is not None:
+        LLMResponse.objects.filter(fingerprint=key).update(
+            hits=F('hits') + 1, last_used_at=timezone.now()
+        )
+    return content
+
+
+def store(key, model, content):
+    if not settings.LLM_CACHE_ENABLED:
+        return
+
+    # a stale entry with the same key gets overwritten (timestamps and hits reset)
+    LLMResponse.objects.bulk_create(
+        [LLMResponse(fingerprint=key, model=model, content=content)],
+        update_conflicts=True,
+        unique_fields=['fingerprint'],
+        update_fields=['model', 'content', 'hits', 'created_at', 'last_used_at'],
+    )
+    prune()
+
+
+def prune():
+    """Drop expired entries, then the least recently used past the size cap"""
+    LLMResponse.objects.filter(
+        created_at__lt=timezone.now() - timedelta(seconds=settings.LLM_CACHE_TTL)
+    ).delete()
+
+    overflow = LLMResponse.objects.order_by('-last_used_at').values_list(
+        'last_used_at', flat=True
+    )[settings.LLM_CACHE_MAX_ENTRIES:settings.LLM_CACHE_MAX_ENTRIES + 1]
+    cutoff = next(iter(overflow), None)
+    if cutoff is not None:
+        LLMResponse.objects.filter(last_used_at__lte=cutoff).delete()
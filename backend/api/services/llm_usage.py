@@ -0,0 +1,92 @@
+"""
+Token and latency accounting for OpenAI calls (LLMCall table).
+
+OpenAIService records one row per completion: prompt/completion tokens from
+the API's usage block, wall-clock latency, and whether the LLM cache answered
+it. usage_stats() rolls them up per kind for /api/stats/.
+
+count_tokens() uses tiktoken when it's installed and a chars/4 estimate
+otherwise - good enough for prompt budgeting and for streamed replies, which
+don't come with a usage block on this openai version.
+"""
+import importlib.util
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Avg, Count, Max, Q, Sum
+from django.utils import timezone
+
+from ..models import LLMCall
+
+
+# chat format overhead per message / per request (OpenAI's cookbook numbers)
+MESSAGE_OVERHEAD = 4
+REPLY_OVERHEAD = 3
+
+_encoding = None
+
+
+def count_tokens(text):
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return math.ceil(len(text) / 4)
+
+
+def count_message_tokens(messages):
+    return sum(count_tokens(m['content']) + MESSAGE_OVERHEAD for m in messages) + REPLY_OVERHEAD
+
+
+def record(kind, model, latency, prompt_tokens=0, completion_tokens=0, cached=False, estimated=False):
+    if not settings.LLM_USAGE_ENABLED:
+        return
+    try:
+        LLMCall.objects.create(
+            kind=kind,
+            model=model,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cached=cached,
+            estimated=estimated,
+            latency_ms=round(latency * 1000),
+        )
+    except Exception as e:
+        # accounting must never break a reply
+        print(f"LLM usage record failed: {e}")
+
+
+def usage_stats(hours=24):
+    """Per-kind totals over the last `hours`"""
+    rows = LLMCall.objects.filter(
+        created_at__gte=timezone.now() - timedelta(hours=hours)
+    ).values('kind').annotate(
+        # names differ from the model fields - reusing them confuses the GROUP BY
+        calls=Count('id'),
+        cache_hits=Count('id', filter=Q(cached=True)),
+        input_tokens=Sum('prompt_tokens'),
+        output_tokens=Sum('completion_tokens'),
+        avg_latency_ms=Avg('latency_ms', filter=Q(cached=False)),
+        max_latency_ms=Max('latency_ms'),
+    ).order_by('kind')
+
+    kinds = {}
+    for row in rows:
+        kind = row.pop('kind')
+        if row['avg_latency_ms'] is not None:
+            row['avg_latency_ms'] = round(row['avg_latency_ms'])
+        kinds[kind] = row
+    return {'hours': hours, 'kinds': kinds}
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None and importlib.util.find_spec('tiktoken') is not None:
+        import tiktoken
+        try:
+            _encoding = tiktoken.encoding_for_model('gpt-4o-mini')
+        except KeyError:
+            _encoding = tiktoken.get_encoding('o200k_base')
+    return _encoding
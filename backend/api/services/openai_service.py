@@ -1,45 +1,32 @@
-from openai import OpenAI
+from asgiref.sync import sync_to_async
 from django.conf import settings
 import json
-import httpx
+import time
+from . import aggregation, llm_cache, llm_usage
+from .http_clients import get_openai_client, get_async_openai_client
 # import logging  # maybe use this for better tracking
 
 
 class OpenAIService:
     
     def __init__(self):
-        # Workaround for proxy issues - see https://github.com/openai/openai-python/issues/...
-        try:
-            http_client = httpx.Client()
-            self.client = OpenAI(
-                api_key=settings.OPENAI_API_KEY,
-                http_client=http_client
-            )
-        except:
-            self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        # one pooled client per process, not a new connection per request
+        self.client = get_openai_client()
         
         self.model = "gpt-4o-mini"
         self.timeout = 30
     
-    def generate_coach_summary(self, metrics):
-        prompt = self._build_coach_prompt(metrics)
-        
+    def generate_coach_summary(self, metrics, use_cache=True):
         try:
-            resp = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You're a no-excuses health coach. Return JSON only. Be direct with numbers.\n\n{\"summary\": \"one sentence calling out the trend\", \"receipts\": [\"HRV 42→55, +31%\"], \"why_it_matters\": \"quick connection to energy/focus\", \"moves_for_this_week\": {\"non_negotiables\": [\"specific actions with targets\"], \"training\": \"readiness to workout intensity\", \"nutrition\": \"protein/hydration numbers\", \"recovery\": \"cold/heat/mobility\"}, \"watchouts\": [\"red flags\"], \"one_percent_upgrade\": \"tiny habit with when/where\", \"if_data_missing\": {\"reason_for_gap\": \"what's missing\", \"quick_fix\": \"how to fix\"}}\n\nBe hype, use numbers, call out flat metrics."
-                    },
-                    {"role": "user", "content": prompt}
-                ],
+            content = self._complete(
+                'coach_summary',
+                messages=self._coach_messages(metrics),
                 temperature=0.45,
                 max_tokens=400,
-                timeout=self.timeout
+                is_valid=self._parse_json_safely,
+                use_cache=use_cache
             )
             
-            content = resp.choices[0].message.content
             result = self._parse_json_safely(content)
             
             if not result:
@@ -52,28 +39,17 @@ class OpenAIService:
             print(f"OpenAI error: {e}")
             return self._fallback_coach_summary()
     
-    def generate_trend_insight(self, metrics):
-        prompt = self._build_trend_prompt(metrics)
-        
+    def generate_trend_insight(self, metrics, use_cache=True):
         try:
-            resp = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """Analyze health trends. Return JSON format:
-{"summary": "one specific sentence about the main trend", "takeaways": ["specific observation with numbers", "pattern or concern to watch"]}
-
-Look for: improving/declining scores, day-to-day volatility, recovery patterns. Call out specific days if they're outliers. Be data-driven."""
-                    },
-                    {"role": "user", "content": prompt}
-                ],
+            content = self._complete(
+                'trend_insight',
+                messages=self._trend_messages(metrics),
                 temperature=0.7,
                 max_tokens=150,
-                timeout=self.timeout
+                is_valid=self._parse_json_safely,
+                use_cache=use_cache
             )
             
-            content = resp.choices[0].message.content
             result = self._parse_json_safely(content)
             
             if not result:
@@ -86,113 +62,351 @@ Look for: improving/declining scores, day-to-day volatility, recovery patterns.
             return self._fallback_trend_insight()
     
     def generate_chat_response(self, message, metrics):
-        ctx = self._build_context(metrics)
-        
         try:
-            resp = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": f"""You're a wellness coach with access to their Oura data. Answer in 2-3 sentences max using their actual numbers. Be specific and practical. No medical advice.
-
-Their recent data:
-{ctx}"""
-                    },
-                    {"role": "user", "content": message}
-                ],
+            content = self._complete(
+                'chat',
+                messages=self._chat_messages(message, metrics),
                 temperature=0.7,
-                max_tokens=150,
-                timeout=self.timeout
+                max_tokens=150
             )
             
-            return {"response": resp.choices[0].message.content}
+            return {"response": content}
             
         except:
             return {"response": "I'm having trouble processing that question right now. Please try again."}
     
+    # async twins for the ASGI views - same prompts, same LLM cache
+    
+    async def agenerate_coach_summary(self, metrics, use_cache=True):
+        try:
+            content = await self._acomplete(
+                'coach_summary',
+                messages=self._coach_messages(metrics),
+                temperature=0.45,
+                max_tokens=400,
+                is_valid=self._parse_json_safely,
+                use_cache=use_cache
+            )
+            
+            result = self._parse_json_safely(content)
+            
+            if not result:
+                print(f"Failed to parse: {content[:200]}")
+                return self._fallback_coach_summary()
+            
+            return result
+            
+        except Exception as e:
+            print(f"OpenAI error: {e}")
+            return self._fallback_coach_summary()
+    
+    async def agenerate_trend_insight(self, metrics, use_cache=True):
+        try:
+            content = await self._acomplete(
+                'trend_insight',
+                messages=self._trend_messages(metrics),
+                temperature=0.7,
+                max_tokens=150,
+                is_valid=self._parse_json_safely,
+                use_cache=use_cache
+            )
+            return self._parse_json_safely(content) or self._fallback_trend_insight()
+            
+        except Exception as e:
+            print(f"OpenAI error: {e}")
+            return self._fallback_trend_insight()
+    
+    async def agenerate_chat_response(self, message, metrics):
+        try:
+            content = await self._acomplete(
+                'chat',
+                messages=self._chat_messages(message, metrics),
+                temperature=0.7,
+                max_tokens=150
+            )
+            
+            return {"response": content}
+            
+        except Exception:
+            return {"response": "I'm having trouble processing that question right now. Please try again."}
+    
+    async def stream_chat_response(self, message, metrics):
+        """
+        Async generator of text deltas for /api/chat/?stream=1.
+        Shares the LLM cache with generate_chat_response - a cached answer
+        comes back as one chunk.
+        """
+        messages = self._chat_messages(message, metrics)
+        key = llm_cache.fingerprint(self.model, messages, temperature=0.7, max_tokens=150)
+        started = time.perf_counter()
+        
+        cached = await sync_to_async(llm_cache.lookup)(key)
+        if cached is not None:
+            await sync_to_async(llm_usage.record)(
+                'chat_stream', self.model, time.perf_counter() - started, cached=True
+            )
+            yield cached
+            return
+        
+        stream = await get_async_openai_client().chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=0.7,
+            max_tokens=150,
+            timeout=self.timeout,
+            stream=True
+        )
+        
+        parts = []
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                yield delta
+        
+        # streamed chunks carry no usage block here, so count it ourselves
+        content = ''.join(parts)
+        await sync_to_async(llm_usage.record)(
+            'chat_stream', self.model, time.perf_counter() - started,
+            prompt_tokens=llm_usage.count_message_tokens(messages),
+            completion_tokens=llm_usage.count_tokens(content),
+            estimated=True
+        )
+        if parts:
+            await sync_to_async(llm_cache.store)(key, self.model, content)
+
+    def iter_chat_response(self, message, metrics):
+        """
+        Sync twin of stream_chat_response for WSGI, where Django would buffer
+        an async generator. Streams over the shared pooled client.
+        """
+        messages = self._chat_messages(message, metrics)
+        key = llm_cache.fingerprint(self.model, messages, temperature=0.7, max_tokens=150)
+        started = time.perf_counter()
+
+        cached = llm_cache.lookup(key)
+        if cached is not None:
+            llm_usage.record('chat_stream', self.model, time.perf_counter() - started, cached=True)
+            yield cached
+            return
+
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=0.7,
+            max_tokens=150,
+            timeout=self.timeout,
+            stream=True
+        )
+
+        parts = []
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                yield delta
+
+        content = ''.join(parts)
+        llm_usage.record(
+            'chat_stream', self.model, time.perf_counter() - started,
+            prompt_tokens=llm_usage.count_message_tokens(messages),
+            completion_tokens=llm_usage.count_tokens(content),
+            estimated=True
+        )
+        if parts:
+            llm_cache.store(key, self.model, content)
+
+    def _coach_messages(self, metrics):
+        return [
+            {
+                "role": "system",
+                "content": "You're a no-excuses health coach. Return JSON only. Be direct with numbers.\n\n{\"summary\": \"one sentence calling out the trend\", \"receipts\": [\"HRV 42→55, +31%\"], \"why_it_matters\": \"quick connection to energy/focus\", \"moves_for_this_week\": {\"non_negotiables\": [\"specific actions with targets\"], \"training\": \"readiness to workout intensity\", \"nutrition\": \"protein/hydration numbers\", \"recovery\": \"cold/heat/mobility\"}, \"watchouts\": [\"red flags\"], \"one_percent_upgrade\": \"tiny habit with when/where\", \"if_data_missing\": {\"reason_for_gap\": \"what's missing\", \"quick_fix\": \"how to fix\"}}\n\nBe hype, use numbers, call out flat metrics."
+            },
+            {"role": "user", "content": self._build_coach_prompt(metrics)}
+        ]
+    
+    def _trend_messages(self, metrics):
+        return [
+            {
+                "role": "system",
+                "content": """Analyze health trends. Return JSON format:
+{"summary": "one specific sentence about the main trend", "takeaways": ["specific observation with numbers", "pattern or concern to watch"]}
+
+Look for: improving/declining scores, day-to-day volatility, recovery patterns. Call out specific days if they're outliers. Be data-driven."""
+            },
+            {"role": "user", "content": self._build_trend_prompt(metrics)}
+        ]
+    
+    def _chat_messages(self, message, metrics):
+        ctx = self._build_context(metrics)
+        return [
+            {
+                "role": "system",
+                "content": f"""You're a wellness coach with access to their Oura data. Answer in 2-3 sentences max using their actual numbers. Be specific and practical. No medical advice.
+
+Their recent data:
+{ctx}"""
+            },
+            {"role": "user", "content": message}
+        ]
+    
+    def _complete(self, kind, messages, temperature, max_tokens, is_valid=None, use_cache=True):
+        """
+        Chat completion text, served from the LLM cache when this exact request
+        (model, messages, sampling params) was answered recently.
+        use_cache=False skips the lookup (a forced regeneration) but still
+        caches the new answer. Only responses that pass is_valid get cached.
+        Every call lands in LLMCall under `kind` with its tokens and latency.
+        """
+        key = llm_cache.fingerprint(
+            self.model, messages, temperature=temperature, max_tokens=max_tokens
+        )
+        started = time.perf_counter()
+        cached = llm_cache.lookup(key) if use_cache else None
+        if cached is not None:
+            llm_usage.record(kind, self.model, time.perf_counter() - started, cached=True)
+            return cached
+        
+        resp = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=self.timeout
+        )
+        content = resp.choices[0].message.content
+        llm_usage.record(kind, self.model, time.perf_counter() - started, **self._usage(resp, messages, content))
+        
+        if content and (is_valid is None or is_valid(content)):
+            llm_cache.store(key, self.model, content)
+        return content
+    
+    async def _acomplete(self, kind, messages, temperature, max_tokens, is_valid=None, use_cache=True):
+        """_complete over the per-loop AsyncOpenAI client"""
+        key = llm_cache.fingerprint(
+            self.model, messages, temperature=temperature, max_tokens=max_tokens
+        )
+        started = time.perf_counter()
+        cached = await sync_to_async(llm_cache.lookup)(key) if use_cache else None
+        if cached is not None:
+            await sync_to_async(llm_usage.record)(
+                kind, self.model, time.perf_counter() - started, cached=True
+            )
+            return cached
+        
+        resp = await get_async_openai_client().chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=self.timeout
+        )
+        content = resp.choices[0].message.content
+        await sync_to_async(llm_usage.record)(
+            kind, self.model, time.perf_counter() - started, **self._usage(resp, messages, content)
+        )
+        
+        if content and (is_valid is None or is_valid(content)):
+            await sync_to_async(llm_cache.store)(key, self.model, content)
+        return content
+    
+    def _usage(self, resp, messages, content):
+        usage = getattr(resp, 'usage', None)
+        if usage is not None:
+            return {'prompt_tokens': usage.prompt_tokens, 'completion_tokens': usage.completion_tokens}
+        return {
+            'prompt_tokens': llm_usage.count_message_tokens(messages),
+            'completion_tokens': llm_usage.count_tokens(content),
+            'estimated': True,
+        }
+    
     def _build_coach_prompt(self, metrics):
         if not metrics:
             return "No data available."
         
-        # calculate averages
-        avg_r = sum(m.get('readiness_score', 0) or 0 for m in metrics) / len(metrics)
-        avg_s = sum(m.get('sleep_score', 0) or 0 for m in metrics) / len(metrics)
-        avg_a = sum(m.get('activity_score', 0) or 0 for m in metrics) / len(metrics)
-        avg_sleep_hrs = sum(m.get('sleep_duration', 0) or 0 for m in metrics) / len(metrics)
-        avg_hrv = sum(m.get('hrv', 0) or 0 for m in metrics) / len(metrics) if any(m.get('hrv') for m in metrics) else 0
-        avg_steps = sum(m.get('steps', 0) or 0 for m in metrics) / len(metrics) if any(m.get('steps') for m in metrics) else 0
-        
-        # calculate trends (first 3 days vs last 3 days)
-        if len(metrics) >= 6:
-            early_r = sum(m.get('readiness_score', 0) or 0 for m in metrics[:3]) / 3
-            late_r = sum(m.get('readiness_score', 0) or 0 for m in metrics[-3:]) / 3
-            trend = "improving" if late_r > early_r + 2 else "declining" if late_r < early_r - 2 else "stable"
-        else:
-            trend = "stable"
-        
-        return f"""7-day summary:
-- Readiness: {avg_r:.0f}/100 ({trend})
-- Sleep: {avg_s:.0f}/100 ({avg_sleep_hrs:.1f}h average)
-- Activity: {avg_a:.0f}/100 ({avg_steps:.0f} steps/day)
-- HRV: {avg_hrv:.0f}ms
+        # same numbers the dashboard shows (one pass, newest-first rows)
+        stats = aggregation.summarize(metrics, window=7, rolling=())
+        avg = stats['averages']
+        trend = stats['trends']['readiness_score']['direction']
+        
+        head = f"""7-day summary:
+- Readiness: {avg['readiness_score'] or 0:.0f}/100 ({trend})
+- Sleep: {avg['sleep_score'] or 0:.0f}/100 ({avg['sleep_duration'] or 0:.1f}h average)
+- Activity: {avg['activity_score'] or 0:.0f}/100 ({avg['steps'] or 0:.0f} steps/day)
+- HRV: {avg['hrv'] or 0:.0f}ms
 
 Daily breakdown:
-{self._format_daily_data(metrics)}"""
+"""
+        return head + self._format_daily_data(metrics, used=llm_usage.count_tokens(head))
     
     def _build_trend_prompt(self, metrics):
         if len(metrics) < 2:
             return "Not enough data."
         
-        # compare first half to second half
-        mid = len(metrics)//2
-        first = metrics[:mid]
-        second = metrics[mid:]
-        
-        # readiness trend
-        r1 = sum(m.get('readiness_score', 0) or 0 for m in first) / len(first)
-        r2 = sum(m.get('readiness_score', 0) or 0 for m in second) / len(second)
-        
-        # sleep trend
-        s1 = sum(m.get('sleep_score', 0) or 0 for m in first) / len(first)
-        s2 = sum(m.get('sleep_score', 0) or 0 for m in second) / len(second)
-        
-        # activity trend
-        a1 = sum(m.get('activity_score', 0) or 0 for m in first) / len(first)
-        a2 = sum(m.get('activity_score', 0) or 0 for m in second) / len(second)
+        # compare older half to newer half
+        trends = aggregation.summarize(metrics, window=7, rolling=())['trends']
+        r = trends['readiness_score']
+        s = trends['sleep_score']
+        a = trends['activity_score']
         
-        return f"""Week comparison (first half vs second half):
-Readiness: {r1:.0f} → {r2:.0f} ({r2-r1:+.0f})
-Sleep: {s1:.0f} → {s2:.0f} ({s2-s1:+.0f})
-Activity: {a1:.0f} → {a2:.0f} ({a2-a1:+.0f})
+        head = f"""Week comparison (first half vs second half):
+Readiness: {r['first'] or 0:.0f} → {r['second'] or 0:.0f} ({r['change'] or 0:+.0f})
+Sleep: {s['first'] or 0:.0f} → {s['second'] or 0:.0f} ({s['change'] or 0:+.0f})
+Activity: {a['first'] or 0:.0f} → {a['second'] or 0:.0f} ({a['change'] or 0:+.0f})
 
 Daily progression:
-{self._format_daily_data(metrics)}"""
+"""
+        return head + self._format_daily_data(metrics, used=llm_usage.count_tokens(head))
     
     def _build_context(self, metrics):
         if not metrics:
             return "No recent data available."
         
         # summary for chat context
-        avg_r = sum(m.get('readiness_score', 0) or 0 for m in metrics) / len(metrics)
-        avg_s = sum(m.get('sleep_score', 0) or 0 for m in metrics) / len(metrics)
-        avg_sleep_hrs = sum(m.get('sleep_duration', 0) or 0 for m in metrics) / len(metrics)
-        avg_hrv = sum(m.get('hrv', 0) or 0 for m in metrics) / len(metrics) if any(m.get('hrv') for m in metrics) else 0
-        
-        latest = metrics[0] if metrics else {}
-        
-        return f"""7-day averages: Readiness {avg_r:.0f}, Sleep {avg_s:.0f} ({avg_sleep_hrs:.1f}h), HRV {avg_hrv:.0f}ms
-Latest day: R:{latest.get('readiness_score', 'N/A')} S:{latest.get('sleep_score', 'N/A')} ({latest.get('sleep_duration', 0):.1f}h)"""
-    
-    def _format_daily_data(self, metrics):
-        lines = []
-        for m in metrics[-7:]:
-            sleep_hrs = m.get('sleep_duration', 0)
-            lines.append(
-                f"- {m.get('date')}: R:{m.get('readiness_score', 'N/A')} "
-                f"S:{m.get('sleep_score', 'N/A')}({sleep_hrs:.1f}h) "
-                f"A:{m.get('activity_score', 'N/A')}"
-            )
+        stats = aggregation.summarize(metrics, window=7, rolling=())
+        avg = stats['averages']
+        latest = stats['latest'] or {}
+        
+        return f"""7-day averages: Readiness {avg['readiness_score'] or 0:.0f}, Sleep {avg['sleep_score'] or 0:.0f} ({avg['sleep_duration'] or 0:.1f}h), HRV {avg['hrv'] or 0:.0f}ms
+Latest day: R:{latest.get('readiness_score', 'N/A')} S:{latest.get('sleep_score', 'N/A')} ({latest.get('sleep_duration') or 0:.1f}h)"""
+    
+    def _format_daily_data(self, metrics, used=0):
+        """
+        Newest-first daily rows, as many as fit in LLM_PROMPT_TOKEN_BUDGET
+        (`used` = tokens already spent on the rest of the prompt).
+        LLM_PROMPT_FORMAT=csv sends a header + bare rows instead of labelled
+        lines - about a third fewer tokens per day.
+        """
+        compact = settings.LLM_PROMPT_FORMAT == 'csv'
+        header = ['date,readiness,sleep,sleep_h,activity'] if compact else []
+        lines = list(header)
+        budget = settings.LLM_PROMPT_TOKEN_BUDGET - used - llm_usage.count_tokens('\n'.join(header))
+        
+        for m in metrics:
+            sleep_hrs = m.get('sleep_duration') or 0
+            if compact:
+                line = ','.join(
+                    '' if v is None else str(v)
+                    for v in (m.get('date'), m.get('readiness_score'), m.get('sleep_score'),
+                              round(sleep_hrs, 1), m.get('activity_score'))
+                )
+            else:
+                line = (
+                    f"- {m.get('date')}: R:{m.get('readiness_score', 'N/A')} "
+                    f"S:{m.get('sleep_score', 'N/A')}({sleep_hrs:.1f}h) "
+                    f"A:{m.get('activity_score', 'N/A')}"
+                )
+            
+            cost = llm_usage.count_tokens(line) + 1  # + newline
+            # always keep the latest day, then stop once the budget is spent
+            if cost > budget and len(lines) > len(header):
+                break
+            budget -= cost
+            lines.append(line)
         return '\n'.join(lines)
     
     def _parse_json_safely(self, content):
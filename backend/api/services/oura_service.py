@@ -1,9 +1,21 @@
+import asyncio
+import time
+import httpx
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from django.conf import settings
+from .http_clients import get_oura_session, get_async_oura_client
+from . import rate_limit
 # import logging  # might need this later
 
 
+# sleep score is separate from duration so need both sleep endpoints
+METRIC_ENDPOINTS = ('sleep', 'daily_sleep', 'daily_readiness', 'daily_activity')
+# max span Oura accepts per heartrate request
+HEARTRATE_WINDOW_DAYS = 30
+
+
 class OuraService:
     
     def __init__(self, access_token):
@@ -11,52 +23,245 @@ class OuraService:
         self.base_url = settings.OURA_API_BASE
         self.headers = {'Authorization': f'Bearer {access_token}'}
     
-    def fetch_metrics(self, days=7):
-        end_date = datetime.now().date()
-        start_date = end_date - timedelta(days=days)
+    def fetch_metrics(self, days=7, start_date=None):
+        # start_date lets incremental syncs ask for a shorter window
+        return [day for chunk in self.iter_metrics(days, start_date) for day in chunk]
+    
+    def iter_metrics(self, days=7, start_date=None, end_date=None):
+        """
+        Merged days, one list per OURA_FETCH_WINDOW_DAYS slice of the range
+        (oldest first). Only one slice is in memory at a time, so a
+        multi-year pull doesn't turn into four giant JSON documents.
+        """
+        end_date = end_date or datetime.now().date()
+        start_date = start_date or end_date - timedelta(days=days)
         
         # print(f"Fetching {days} days from {start_date} to {end_date}")
         
+        window = timedelta(days=settings.OURA_FETCH_WINDOW_DAYS)
+        chunk_start = start_date
+        while chunk_start <= end_date:
+            chunk_end = min(chunk_start + window - timedelta(days=1), end_date)
+            try:
+                sleep_data, daily_sleep_data, readiness_data, activity_data = (
+                    self._fetch_endpoints(METRIC_ENDPOINTS, chunk_start, chunk_end)
+                )
+                
+                # merge everything by date
+                merged = self._merge_data(sleep_data, daily_sleep_data, readiness_data, activity_data)
+                
+            except Exception as e:
+                print(f"Error fetching Oura data: {e}")
+                raise
+            yield merged
+            chunk_start = chunk_end + timedelta(days=1)
+    
+    def fetch_workouts(self, days=30, start_date=None, raise_errors=False):
+        # syncs pass raise_errors so a failed fetch doesn't look like "no workouts"
         try:
-            # sleep score is separate from duration so need both endpoints
-            sleep_data = self._fetch_endpoint('sleep', start_date, end_date)
-            daily_sleep_data = self._fetch_endpoint('daily_sleep', start_date, end_date)
-            readiness_data = self._fetch_endpoint('daily_readiness', start_date, end_date)
-            activity_data = self._fetch_endpoint('daily_activity', start_date, end_date)
-            
-            # merge everything by date
-            result = self._merge_data(sleep_data, daily_sleep_data, readiness_data, activity_data)
-            # print(f"Got {len(result)} days of data")
-            return result
+            return [w for page in self.iter_workouts(days, start_date) for w in page]
+        except Exception as e:
+            print(f"Error fetching workouts: {e}")
+            if raise_errors:
+                raise
+            return []
+    
+    def iter_workouts(self, days=30, start_date=None, end_date=None):
+        """Raw workout records one API page at a time. Errors are raised."""
+        end_date = end_date or datetime.now().date()
+        start_date = start_date or end_date - timedelta(days=days)
+        return self.iter_endpoint('workout', start_date, end_date)
+    
+    def iter_heartrate(self, start_date, end_date):
+        """
+        Raw heart-rate samples ({bpm, source, timestamp}) for whole UTC days
+        start_date..end_date, one API page at a time, oldest first.
+        """
+        # heartrate takes datetimes, and only up to 30 days per request
+        chunk_start = start_date
+        while chunk_start <= end_date:
+            chunk_end = min(chunk_start + timedelta(days=HEARTRATE_WINDOW_DAYS - 1), end_date)
+            yield from self._iter_pages(f"{self.base_url}/heartrate", {
+                'start_datetime': f'{chunk_start.isoformat()}T00:00:00+00:00',
+                'end_datetime': f'{(chunk_end + timedelta(days=1)).isoformat()}T00:00:00+00:00',
+            })
+            chunk_start = chunk_end + timedelta(days=1)
+    
+    def iter_endpoint(self, endpoint, start_date, end_date):
+        """
+        Yields each page's records, following next_token until Oura stops
+        sending one. Lazy - the next page isn't requested until this one
+        has been consumed.
+        """
+        url = f"{self.base_url}/{endpoint}"
+        params = {
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat()
+        }
+        return self._iter_pages(url, params)
+    
+    def _iter_pages(self, url, params):
+        while True:
+            body = self._get(url, params).json()
+            yield body.get('data', [])
             
+            next_token = body.get('next_token')
+            if not next_token:
+                return
+            params = {**params, 'next_token': next_token}
+    
+    def fetch_personal_info(self):
+        """The account's profile - 'id' is what webhook events call user_id"""
+        return self._get(f"{self.base_url}/personal_info", {}).json()
+    
+    async def afetch_metrics(self, days=7, start_date=None):
+        """fetch_metrics for async callers - the four endpoints go out with gather()"""
+        end_date = datetime.now().date()
+        start_date = start_date or end_date - timedelta(days=days)
+        
+        try:
+            results = await asyncio.gather(*(
+                self._afetch_endpoint(e, start_date, end_date) for e in METRIC_ENDPOINTS
+            ))
+            return self._merge_data(*results)
         except Exception as e:
             print(f"Error fetching Oura data: {e}")
             raise
     
-    def fetch_workouts(self, days=30):
+    async def afetch_workouts(self, days=30, start_date=None, raise_errors=False):
         end_date = datetime.now().date()
-        start_date = end_date - timedelta(days=days)
+        start_date = start_date or end_date - timedelta(days=days)
         
         try:
-            workout_data = self._fetch_endpoint('workout', start_date, end_date)
+            workout_data = await self._afetch_endpoint('workout', start_date, end_date)
             return workout_data.get('data', [])
         except Exception as e:
             print(f"Error fetching workouts: {e}")
+            if raise_errors:
+                raise
             return []
     
+    def _fetch_endpoints(self, endpoints, start_date, end_date):
+        """Fetch several endpoints in parallel, results in the same order as endpoints"""
+        # each call is just waiting on the network so threads are fine here
+        workers = min(len(endpoints), settings.OURA_FETCH_WORKERS)
+        if workers <= 1:
+            return [self._fetch_endpoint(e, start_date, end_date) for e in endpoints]
+        
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(self._fetch_endpoint, e, start_date, end_date)
+                for e in endpoints
+            ]
+            # .result() re-raises the first failure, same as the old serial version
+            return [f.result() for f in futures]
+    
     def _fetch_endpoint(self, endpoint, start_date, end_date):
+        # every page, in the single-document shape _merge_data expects
+        pages = self.iter_endpoint(endpoint, start_date, end_date)
+        return {'data': [item for page in pages for item in page]}
+    
+    async def _afetch_endpoint(self, endpoint, start_date, end_date):
+        pages = self.aiter_endpoint(endpoint, start_date, end_date)
+        return {'data': [item async for page in pages for item in page]}
+    
+    async def aiter_endpoint(self, endpoint, start_date, end_date):
+        """Async twin of iter_endpoint"""
         url = f"{self.base_url}/{endpoint}"
         params = {
             'start_date': start_date.isoformat(),
             'end_date': end_date.isoformat()
         }
+        while True:
+            body = (await self._aget(url, params)).json()
+            yield body.get('data', [])
+            
+            next_token = body.get('next_token')
+            if not next_token:
+                return
+            params = {**params, 'next_token': next_token}
+    
+    def _get(self, url, params):
+        """GET with per-token throttling and retries on 429/5xx/connection errors"""
+        bucket = rate_limit.get_bucket(self.token)
+        attempt = 0
+        
+        while True:
+            waited = bucket.acquire()
+            rate_limit.record(requests=1, throttled_seconds=waited)
+            
+            try:
+                response = get_oura_session().get(url, headers=self.headers, params=params, timeout=10)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                delay = self._retry_delay(bucket, attempt, error=e)
+            else:
+                delay = self._retry_delay(bucket, attempt, response=response)
+                if delay is None:
+                    return response
+            
+            time.sleep(delay)
+            attempt += 1
+    
+    async def _aget(self, url, params):
+        """Async twin of _get for the ASGI views (same bucket, same retry rules)"""
+        bucket = rate_limit.get_bucket(self.token)
+        attempt = 0
+        
+        while True:
+            waited = bucket.reserve()
+            if waited:
+                await asyncio.sleep(waited)
+            rate_limit.record(requests=1, throttled_seconds=waited)
+            
+            try:
+                response = await get_async_oura_client().get(
+                    url, headers=self.headers, params=params, timeout=10
+                )
+            except httpx.TransportError as e:
+                delay = self._retry_delay(bucket, attempt, error=e)
+            else:
+                delay = self._retry_delay(bucket, attempt, response=response)
+                if delay is None:
+                    return response
+            
+            await asyncio.sleep(delay)
+            attempt += 1
+    
+    def _retry_delay(self, bucket, attempt, response=None, error=None):
+        """
+        None if the response is final (success, or a non-retryable error which
+        gets raised here). Otherwise how long to back off before the next try.
+        """
+        if error is not None:
+            if attempt >= settings.OURA_MAX_RETRIES:
+                rate_limit.record(gave_up=1)
+                raise error
+            rate_limit.record(connection_errors=1)
+            delay = rate_limit.backoff_delay(attempt)
+        else:
+            if response.status_code not in rate_limit.RETRY_STATUSES:
+                response.raise_for_status()
+                return None
+            if attempt >= settings.OURA_MAX_RETRIES:
+                rate_limit.record(gave_up=1)
+                response.raise_for_status()
+            
+            delay = rate_limit.retry_after_seconds(response)
+            if delay is None:
+                delay = rate_limit.backoff_delay(attempt)
+            
+            if response.status_code == 429:
+                # hold everyone on this token, not just this caller
+                bucket.pause(delay)
+                rate_limit.record(rate_limited=1)
+            else:
+                rate_limit.record(server_errors=1)
         
-        # TODO: Add retry logic for rate limits
-        response = requests.get(url, headers=self.headers, params=params, timeout=10)
-        response.raise_for_status()
-        return response.json()
+        rate_limit.record(retries=1, throttled_seconds=delay)
+        return delay
     
     def _merge_data(self, sleep_data, daily_sleep_data, readiness_data, activity_data):
+        # one OURA_FETCH_WINDOW_DAYS window at a time, so this stays small
         data = {}
         
         # sleep data is usually most complete so start there
@@ -99,4 +304,3 @@ class OuraService:
         
         # sort by date before returning
         return sorted(data.values(), key=lambda x: x['date'])
-
@@ -0,0 +1,187 @@
+"""
+Lean read path for the metric/workout list payloads.
+
+.values() projections straight into dicts - no model instances, no per-field
+serializer calls - and workout duration comes out of SQL. Output matches
+OuraMetricSerializer / the old hand-built workout dicts once rendered (dates
+and datetimes are left for the renderer).
+
+The list endpoints page newest-first with a keyset cursor (the last row's
+date, or day + id for workouts) instead of OFFSET, so page N costs the same
+as page 1 however long the history is.
+"""
+from django.db.models import DurationField, ExpressionWrapper, F, Q
+
+from ..models import OuraMetric, Workout
+from ..serializers import OuraMetricSerializer
+from .dates import parse_day
+
+
+# same columns the serializer exposes
+METRIC_FIELDS = tuple(OuraMetricSerializer.Meta.fields)
+
+WORKOUT_FIELDS = (
+    'id', 'day', 'activity', 'calories', 'intensity',
+    'start_datetime', 'end_datetime', 'source',
+)
+
+# what a client may ask for with ?fields=
+WORKOUT_API_FIELDS = WORKOUT_FIELDS + ('duration_minutes',)
+
+DEFAULT_LIMIT = 30
+MAX_LIMIT = 366
+
+# NULL when either end is missing, like Workout.duration_minutes
+WORKOUT_DURATION = ExpressionWrapper(
+    F('end_datetime') - F('start_datetime'), output_field=DurationField()
+)
+
+
+def recent_metrics(user, limit=DEFAULT_LIMIT):
+    return metrics_page(user, limit)[0]
+
+
+def recent_workouts(user, limit=DEFAULT_LIMIT):
+    return workouts_page(user, limit)[0]
+
+
+def parse_metrics_params(params):
+    return _parse_page_params(params, METRIC_FIELDS, lambda c: parse_day(c, 'cursor'))
+
+
+def parse_workouts_params(params):
+    return _parse_page_params(params, WORKOUT_API_FIELDS, _parse_workout_cursor)
+
+
+def _parse_page_params(params, allowed_fields, parse_cursor):
+    """
+    {'limit', 'start', 'end', 'fields', 'cursor'} from the query string.
+    No params means the old behaviour: latest 30 rows, every field.
+    Raises ValueError with a user-facing message on bad input.
+    """
+    try:
+        limit = int(params.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise ValueError('limit must be a number')
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f'limit must be between 1 and {MAX_LIMIT}')
+
+    fields = tuple(allowed_fields)
+    if params.get('fields'):
+        fields = tuple(f.strip() for f in params['fields'].split(',') if f.strip())
+        unknown = [f for f in fields if f not in allowed_fields]
+        if unknown:
+            raise ValueError(f"unknown fields: {', '.join(unknown)}")
+
+    start = parse_day(params.get('start'), 'start')
+    end = parse_day(params.get('end'), 'end')
+    if start and end and start > end:
+        raise ValueError('start must be on or before end')
+
+    cursor = params.get('cursor') or None
+    if cursor:
+        parse_cursor(cursor)  # reject garbage here rather than mid-query
+
+    return {'limit': limit, 'start': start, 'end': end, 'fields': fields, 'cursor': cursor}
+
+
+def page_variant(page):
+    """response_cache variant key for one page"""
+    return ':'.join([
+        str(page['limit']), str(page['start'] or ''), str(page['end'] or ''),
+        ','.join(page['fields']), page['cursor'] or '',
+    ])
+
+
+def metrics_page(user, limit=DEFAULT_LIMIT, start=None, end=None, fields=METRIC_FIELDS, cursor=None):
+    """(rows, next_cursor) - next_cursor is None on the last page"""
+    qs = _metrics_page_query(user, limit, start, end, fields, cursor)
+    return _metrics_page_result(list(qs), limit, fields)
+
+
+async def ametrics_page(user, limit=DEFAULT_LIMIT, start=None, end=None, fields=METRIC_FIELDS, cursor=None):
+    qs = _metrics_page_query(user, limit, start, end, fields, cursor)
+    return _metrics_page_result([row async for row in qs], limit, fields)
+
+
+def workouts_page(user, limit=DEFAULT_LIMIT, start=None, end=None, fields=WORKOUT_API_FIELDS, cursor=None):
+    qs = _workouts_page_query(user, limit, start, end, fields, cursor)
+    return _workouts_page_result(list(qs), limit, fields)
+
+
+async def aworkouts_page(user, limit=DEFAULT_LIMIT, start=None, end=None, fields=WORKOUT_API_FIELDS, cursor=None):
+    qs = _workouts_page_query(user, limit, start, end, fields, cursor)
+    return _workouts_page_result([row async for row in qs], limit, fields)
+
+
+def _metrics_page_query(user, limit, start, end, fields, cursor):
+    qs = OuraMetric.objects.filter(user=user)
+    if start:
+        qs = qs.filter(date__gte=start)
+    if end:
+        qs = qs.filter(date__lte=end)
+    if cursor:
+        # one row per user per day, so the date alone is a unique key
+        qs = qs.filter(date__lt=parse_day(cursor, 'cursor'))
+    # date is always selected - the next cursor comes from it
+    select = dict.fromkeys(('date',) + tuple(fields))
+    # one extra row tells us whether there's another page
+    return qs.order_by('-date').values(*select)[:limit + 1]
+
+
+def _metrics_page_result(rows, limit, fields):
+    next_cursor = rows[limit - 1]['date'].isoformat() if len(rows) > limit else None
+    rows = rows[:limit]
+    if 'date' not in fields:
+        for row in rows:
+            del row['date']
+    return rows, next_cursor
+
+
+def _workouts_page_query(user, limit, start, end, fields, cursor):
+    qs = Workout.objects.filter(user=user)
+    if start:
+        qs = qs.filter(day__gte=start)
+    if end:
+        qs = qs.filter(day__lte=end)
+    if cursor:
+        # several workouts can share a day, so the key is (day, id)
+        day, pk = _parse_workout_cursor(cursor)
+        qs = qs.filter(Q(day__lt=day) | Q(day=day, id__lt=pk))
+
+    columns = [f for f in fields if f != 'duration_minutes']
+    if 'duration_minutes' in fields:
+        qs = qs.annotate(duration=WORKOUT_DURATION)
+        columns.append('duration')
+    select = dict.fromkeys(['id', 'day'] + columns)
+    return qs.order_by('-day', '-id').values(*select)[:limit + 1]
+
+
+def _workouts_page_result(rows, limit, fields):
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = f"{last['day'].isoformat()}_{last['id']}"
+    rows = rows[:limit]
+
+    for row in rows:
+        if 'duration_minutes' in fields:
+            _workout_row(row)
+        for key in ('id', 'day'):
+            if key not in fields:
+                del row[key]
+    return rows, next_cursor
+
+
+def _parse_workout_cursor(cursor):
+    day, _, pk = cursor.partition('_')
+    if not pk.isdigit():
+        raise ValueError('invalid cursor')
+    return parse_day(day, 'cursor'), int(pk)
+
+
+
+def _workout_row(row):
+    duration = row.pop('duration')
+    row['duration_minutes'] = round(duration.total_seconds() / 60) if duration is not None else None
+    return row
@@ -0,0 +1,109 @@
+"""
+Bulk upserts for the Oura models.
+
+One INSERT ... ON CONFLICT DO UPDATE per batch inside a single transaction,
+instead of a SELECT + INSERT/UPDATE per row in autocommit.
+Needs SQLite 3.24+ or Postgres (both fine for us).
+"""
+from django.db import transaction
+
+from ..models import OuraMetric, Workout
+from . import rollups
+
+
+METRIC_FIELDS = [
+    'readiness_score', 'sleep_score', 'activity_score',
+    'sleep_duration', 'deep_sleep', 'rem_sleep', 'bedtime_start',
+    'hrv', 'resting_hr', 'steps', 'active_calories',
+]
+
+WORKOUT_FIELDS = [
+    'user', 'day', 'activity', 'calories', 'intensity',
+    'start_datetime', 'end_datetime', 'source',
+]
+
+# keeps each statement well under SQLite's bound-parameter limit
+BATCH_SIZE = 500
+
+
+def upsert_metrics(user, rows, refresh_rollups=True):
+    """rows are the merged day dicts from OuraService.fetch_metrics"""
+    objs = [
+        OuraMetric(
+            user=user,
+            date=item['date'],
+            **{field: item.get(field) for field in METRIC_FIELDS}
+        )
+        for item in rows
+    ]
+    if not objs:
+        return 0
+
+    with transaction.atomic():
+        OuraMetric.objects.bulk_create(
+            objs,
+            batch_size=BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['user', 'date'],
+            # updated_at so the row still looks freshly synced
+            update_fields=METRIC_FIELDS + ['updated_at'],
+        )
+        # keep the rolling-window table in step with the rows we just wrote
+        if refresh_rollups:
+            rollups.refresh(user, min(str(item['date']) for item in rows))
+    return len(objs)
+
+
+def upsert_metrics_chunks(user, chunks, refresh_rollups=True):
+    """
+    upsert_metrics over an iterable of row lists (OuraService.iter_metrics),
+    one transaction per chunk so only one chunk is ever held in memory.
+    Rollups are refreshed once at the end instead of once per chunk.
+    """
+    total = 0
+    since = None
+    for rows in chunks:
+        total += upsert_metrics(user, rows, refresh_rollups=False)
+        if rows:
+            first = min(str(item['date']) for item in rows)
+            since = first if since is None else min(since, first)
+
+    if refresh_rollups and since is not None:
+        with transaction.atomic():
+            rollups.refresh(user, since)
+    return total
+
+
+def upsert_workouts(user, rows):
+    """rows are the raw workout records from the Oura API"""
+    objs = [
+        Workout(
+            user=user,
+            oura_id=item['id'],
+            day=item['day'],
+            activity=item.get('activity', 'Unknown'),
+            calories=item.get('calories'),
+            intensity=item.get('intensity'),
+            start_datetime=item.get('start_datetime'),
+            end_datetime=item.get('end_datetime'),
+            source=item.get('source'),
+        )
+        for item in rows
+    ]
+    if not objs:
+        return 0
+
+    with transaction.atomic():
+        Workout.objects.bulk_create(
+            objs,
+            batch_size=BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['oura_id'],
+            update_fields=WORKOUT_FIELDS + ['updated_at'],
+        )
+    return len(objs)
+
+
+def upsert_workouts_chunks(user, chunks):
+    """upsert_workouts page by page (OuraService.iter_workouts)"""
+    return sum(upsert_workouts(user, rows) for rows in chunks)
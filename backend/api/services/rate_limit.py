@@ -0,0 +1,137 @@
+"""
+Retry + throttling helpers for the Oura client.
+
+Every access token gets one shared token bucket per process, so the parallel
+endpoint fetches, the views and the sync jobs all draw from the same budget.
+On a 429 the bucket itself is paused for Retry-After, which makes every other
+caller on that token wait instead of piling on more requests.
+"""
+import hashlib
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from django.conf import settings
+
+
+# statuses worth another try - everything else fails straight away
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Blocking token bucket. acquire() waits rather than rejecting."""
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Take one token, sleeping as needed. Returns seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.paused_until:
+                    delay = self.paused_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                else:
+                    delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def reserve(self):
+        """
+        Non-blocking acquire for async callers: takes a token now (the balance
+        can go negative) and returns how long to wait before using it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            return max(self.paused_until - now, -self.tokens / self.rate, 0.0)
+
+    def pause(self, seconds):
+        """Stop handing out tokens for a while (server told us to back off)"""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+_stats = {
+    'requests': 0,
+    'retries': 0,
+    'rate_limited': 0,
+    'server_errors': 0,
+    'connection_errors': 0,
+    'gave_up': 0,
+    'throttled_seconds': 0.0,
+}
+_stats_lock = threading.Lock()
+
+
+def get_bucket(access_token):
+    # don't keep raw tokens around as dict keys
+    key = hashlib.sha256(access_token.encode()).hexdigest()
+    with _buckets_lock:
+        bucket = _buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(settings.OURA_RATE_PER_SECOND, settings.OURA_RATE_BURST)
+            _buckets[key] = bucket
+        return bucket
+
+
+def set_rate(access_token, rate, capacity=None):
+    """Swap in a bucket with a different budget (oura_backfill --rate)"""
+    key = hashlib.sha256(access_token.encode()).hexdigest()
+    with _buckets_lock:
+        _buckets[key] = TokenBucket(rate, capacity or settings.OURA_RATE_BURST)
+
+
+def record(**counts):
+    with _stats_lock:
+        for name, value in counts.items():
+            _stats[name] += value
+
+
+def retry_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['throttled_seconds'] = round(stats['throttled_seconds'], 3)
+    return stats
+
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff: uniform(0, base * 2^attempt), capped"""
+    ceiling = min(settings.OURA_RETRY_MAX_DELAY, settings.OURA_RETRY_BASE_DELAY * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+def retry_after_seconds(response):
+    """Parse Retry-After (seconds or HTTP date). None if missing/garbage."""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        seconds = when.timestamp() - time.time()
+    return min(max(seconds, 0.0), settings.OURA_RETRY_MAX_DELAY)
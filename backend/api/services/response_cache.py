@@ -0,0 +1,108 @@
+"""
+Per-user response cache on top of Django's cache framework.
+
+Payloads are stored already serialized (plain dicts/lists) so a warm request
+skips the DB and the serializers entirely. Each user/resource pair has a
+generation number baked into the key; syncs bump it instead of trying to
+find and delete every variant (e.g. ?window=7 vs ?window=30).
+
+A view works out its key once, before reading the DB, and stores under that
+same key. If a sync invalidates in between, the payload lands under the old
+generation where nobody reads it, instead of passing for fresh data:
+
+    cache_key = response_cache.key(user.id, response_cache.METRICS, variant)
+    payload = response_cache.get(cache_key)
+    if payload is None:
+        payload = build()
+        response_cache.store(cache_key, payload, timeout)
+"""
+import threading
+import time
+
+from django.core.cache import cache
+
+
+METRICS = 'metrics'
+METRICS_SUMMARY = 'metrics_summary'
+WORKOUTS = 'workouts'
+COACH_SUMMARY = 'coach_summary'
+HEARTRATE = 'heartrate'
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def key(user_id, resource, variant=''):
+    """Cache key for the resource at its current generation"""
+    gen_key = _generation_key(user_id, resource)
+    # seed with the clock so an evicted generation never comes back as an old value
+    generation = cache.get_or_set(gen_key, int(time.time() * 1000), None)
+    return _payload_key(user_id, resource, generation, variant)
+
+
+async def akey(user_id, resource, variant=''):
+    generation = await cache.aget_or_set(
+        _generation_key(user_id, resource), int(time.time() * 1000), None
+    )
+    return _payload_key(user_id, resource, generation, variant)
+
+
+def get(cache_key):
+    payload = cache.get(cache_key)
+    _record(_resource(cache_key), 'hits' if payload is not None else 'misses')
+    return payload
+
+
+def store(cache_key, payload, timeout):
+    cache.set(cache_key, payload, timeout)
+
+
+async def aget(cache_key):
+    payload = await cache.aget(cache_key)
+    _record(_resource(cache_key), 'hits' if payload is not None else 'misses')
+    return payload
+
+
+async def astore(cache_key, payload, timeout):
+    await cache.aset(cache_key, payload, timeout)
+
+
+def invalidate(user_id, *resources):
+    """Drop every cached variant of these resources for the user"""
+    for resource in resources:
+        try:
+            cache.incr(_generation_key(user_id, resource))
+        except ValueError:
+            pass  # no generation yet, so nothing cached either
+        _record(resource, 'invalidations')
+
+
+def cache_stats():
+    with _stats_lock:
+        per_resource = {name: dict(counts) for name, counts in _stats.items()}
+    hits = sum(c.get('hits', 0) for c in per_resource.values())
+    misses = sum(c.get('misses', 0) for c in per_resource.values())
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / (hits + misses), 3) if hits + misses else None,
+        'resources': per_resource,
+    }
+
+
+def _payload_key(user_id, resource, generation, variant):
+    return f'resp:{user_id}:{resource}:{generation}:{variant}'
+
+
+def _resource(cache_key):
+    return cache_key.split(':', 3)[2]
+
+
+def _generation_key(user_id, resource):
+    return f'resp:gen:{user_id}:{resource}'
+
+
+def _record(resource, counter):
+    with _stats_lock:
+        counts = _stats.setdefault(resource, {})
+        counts[counter] = counts.get(counter, 0) + 1
@@ -0,0 +1,116 @@
+"""
+Precomputed rolling-window statistics (DailyStatistic).
+
+persistence.upsert_metrics calls refresh() with the earliest day it touched;
+only the windows that overlap that day (and the ones whose delta compares
+against it) get recomputed, so a daily sync rewrites a handful of rows no
+matter how much history the user has.
+"""
+import math
+from datetime import timedelta
+
+from django.db import transaction
+
+from ..models import DailyStatistic, OuraMetric
+from .aggregation import AVG_FIELDS, ROLLING_WINDOWS
+from .dates import as_date
+
+
+BATCH_SIZE = 500
+
+
+def refresh(user, since):
+    """Recompute rollups for every metric day >= since. Returns rows written."""
+    since = as_date(since)
+    longest = max(ROLLING_WINDOWS)
+    # enough history before `since` for the longest window and its previous window
+    rows = OuraMetric.objects.filter(
+        user=user, date__gte=since - timedelta(days=2 * longest - 1)
+    ).order_by('date').values('date', *AVG_FIELDS)
+    rows = list(rows)
+    if not rows:
+        return 0
+
+    first_day = rows[0]['date']
+    span = (rows[-1]['date'] - first_day).days + 1
+    # one slot per calendar day so windows are date ranges, not row counts
+    columns = {field: [None] * span for field in AVG_FIELDS}
+    for row in rows:
+        i = (row['date'] - first_day).days
+        for field in AVG_FIELDS:
+            columns[field][i] = row[field]
+
+    prefix = {field: _prefix_sums(values) for field, values in columns.items()}
+
+    objs = []
+    for row in rows:
+        if row['date'] < since:
+            continue
+        end = (row['date'] - first_day).days + 1  # exclusive index
+        for window in ROLLING_WINDOWS:
+            stats = {}
+            for field in AVG_FIELDS:
+                current = _window_stats(columns[field], prefix[field], end - window, end)
+                previous = _window_stats(columns[field], prefix[field], end - 2 * window, end - window)
+                if current['mean'] is not None and previous['mean'] is not None:
+                    current['delta'] = round(current['mean'] - previous['mean'], 2)
+                else:
+                    current['delta'] = None
+                stats[field] = current
+            objs.append(DailyStatistic(user=user, date=row['date'], window=window, stats=stats))
+
+    with transaction.atomic():
+        DailyStatistic.objects.bulk_create(
+            objs,
+            batch_size=BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['user', 'date', 'window'],
+            update_fields=['stats', 'updated_at'],
+        )
+    return len(objs)
+
+
+def latest(user):
+    """{window: stats} for the most recent day that has rollups, or None"""
+    latest_day = DailyStatistic.objects.filter(user=user).order_by('-date').values_list('date', flat=True).first()
+    if latest_day is None:
+        return None
+    return {
+        str(window): stats
+        for window, stats in DailyStatistic.objects.filter(
+            user=user, date=latest_day
+        ).values_list('window', 'stats')
+    }
+
+
+def _prefix_sums(values):
+    """(count, sum, sum of squares) prefix arrays - O(1) mean/std for any range"""
+    count, total, squares = [0], [0.0], [0.0]
+    for v in values:
+        present = v is not None
+        count.append(count[-1] + present)
+        total.append(total[-1] + (v if present else 0))
+        squares.append(squares[-1] + (v * v if present else 0))
+    return count, total, squares
+
+
+def _window_stats(values, prefix, start, end):
+    start = max(start, 0)
+    if end <= start:
+        return {'mean': None, 'std': None, 'min': None, 'max': None, 'count': 0}
+
+    count, total, squares = prefix
+    n = count[end] - count[start]
+    if not n:
+        return {'mean': None, 'std': None, 'min': None, 'max': None, 'count': 0}
+
+    mean = (total[end] - total[start]) / n
+    variance = max((squares[end] - squares[start]) / n - mean * mean, 0.0)
+    present = [v for v in values[start:end] if v is not None]
+    return {
+        'mean': round(mean, 2),
+        'std': round(math.sqrt(variance), 2),
+        'min': min(present),
+        'max': max(present),
+        'count': n,
+    }
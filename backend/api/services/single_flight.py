@@ -0,0 +1,165 @@
+"""
+Single-flight: concurrent callers asking for the same thing share one call.
+
+Within a process, followers just wait on the leader's Event. Across processes
+the leader also takes a cache lock and publishes its result to the cache,
+so with a shared backend (REDIS_URL / CACHE_DIR) other workers wait for that
+instead of starting their own Oura fetch or LLM generation. With the default
+local-memory cache the cross-process part is a no-op.
+
+ado() is the same thing for coroutines (the async views): followers await
+the leader's future instead of blocking a thread.
+"""
+import asyncio
+import threading
+import time
+import uuid
+import weakref
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_calls = {}
+_lock = threading.Lock()
+
+# futures belong to one event loop, so the async side keeps a table per loop
+_async_calls = weakref.WeakKeyDictionary()
+
+_stats = {'leaders': 0, 'followers': 0, 'remote_followers': 0}
+_stats_lock = threading.Lock()
+
+
+def do(key, fn):
+    """Run fn() once for everyone currently asking for `key`, return its result"""
+    with _lock:
+        call = _calls.get(key)
+        leader = call is None
+        if leader:
+            call = _Call()
+            _calls[key] = call
+
+    if not leader:
+        _record('followers')
+        call.event.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    _record('leaders')
+    try:
+        call.result = _run_shared(key, fn)
+        return call.result
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        with _lock:
+            _calls.pop(key, None)
+        call.event.set()
+
+
+async def ado(key, coro_fn):
+    """Await coro_fn() once for everyone on this loop asking for `key`"""
+    calls = _async_calls.setdefault(asyncio.get_running_loop(), {})
+    future = calls.get(key)
+    if future is not None:
+        _record('followers')
+        # shield so a follower's client going away doesn't cancel the leader
+        return await asyncio.shield(future)
+
+    future = asyncio.get_running_loop().create_future()
+    calls[key] = future
+    _record('leaders')
+    try:
+        result = await _arun_shared(key, coro_fn)
+        future.set_result(result)
+        return result
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # mark retrieved - there may be no followers
+        raise
+    finally:
+        calls.pop(key, None)
+
+
+def single_flight_stats():
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _run_shared(key, fn):
+    lock_key = f'sf:lock:{key}'
+    flight_id = uuid.uuid4().hex
+
+    if cache.add(lock_key, flight_id, settings.SINGLE_FLIGHT_TIMEOUT):
+        try:
+            result = fn()
+            # tuple so a None result is still distinguishable from a miss
+            cache.set(f'sf:result:{key}:{flight_id}', (result,), settings.SINGLE_FLIGHT_RESULT_TTL)
+            return result
+        finally:
+            cache.delete(lock_key)
+
+    # another process is already on it - wait for its answer
+    _record('remote_followers')
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT_TIMEOUT
+    other_flight = cache.get(lock_key)
+    while other_flight and time.monotonic() < deadline:
+        published = cache.get(f'sf:result:{key}:{other_flight}')
+        if published is not None:
+            return published[0]
+        if cache.get(lock_key) != other_flight:
+            # finished (or died) - one last look for its result
+            published = cache.get(f'sf:result:{key}:{other_flight}')
+            if published is not None:
+                return published[0]
+            break
+        time.sleep(0.1)
+
+    # leader failed or timed out, do it ourselves
+    return fn()
+
+
+async def _arun_shared(key, coro_fn):
+    lock_key = f'sf:lock:{key}'
+    flight_id = uuid.uuid4().hex
+
+    if await cache.aadd(lock_key, flight_id, settings.SINGLE_FLIGHT_TIMEOUT):
+        try:
+            result = await coro_fn()
+            await cache.aset(f'sf:result:{key}:{flight_id}', (result,), settings.SINGLE_FLIGHT_RESULT_TTL)
+            return result
+        finally:
+            await cache.adelete(lock_key)
+
+    _record('remote_followers')
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT_TIMEOUT
+    other_flight = await cache.aget(lock_key)
+    while other_flight and time.monotonic() < deadline:
+        published = await cache.aget(f'sf:result:{key}:{other_flight}')
+        if published is not None:
+            return published[0]
+        if await cache.aget(lock_key) != other_flight:
+            published = await cache.aget(f'sf:result:{key}:{other_flight}')
+            if published is not None:
+                return published[0]
+            break
+        await asyncio.sleep(0.1)
+
+    return await coro_fn()
+
+
+def _record(counter):
+    with _stats_lock:
+        _stats[counter] += 1
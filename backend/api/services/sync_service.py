@@ -0,0 +1,239 @@
+"""
+Pulls Oura data into the DB.
+
+Each user/data set keeps a SyncState high-water mark. After the first full
+window we only ask Oura for the days since the last sync, plus a small
+overlap because Oura re-scores the last day or two as data trickles in.
+
+Syncs take a row lock on the SyncState (locked_until) so the background
+worker and a manual ?force=true never fetch the same user at the same time.
+"""
+import asyncio
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models import SyncState
+from .oura_service import OuraService
+from . import heartrate, persistence, response_cache
+
+
+METRICS = 'metrics'
+WORKOUTS = 'workout'
+HEARTRATE = 'heartrate'
+
+
+def sync_metrics(user, access_token, days=30, full=False, wait=0):
+    """
+    Fetch + save daily metrics. Returns the number of days Oura sent back,
+    or None if another sync already had the lock (after waiting up to `wait`
+    seconds for it to finish, so its rows are in the DB by then).
+    """
+    with sync_lock(user, METRICS, wait) as state:
+        if state is None:
+            return None
+
+        start_date = _window_start(state, days, full)
+        # saved a window at a time as the pages come in
+        chunks = OuraService(access_token).iter_metrics(days=days, start_date=start_date)
+        return _save_metrics(user, state, chunks)
+
+
+def sync_workouts(user, access_token, days=30, full=False, wait=0):
+    """Fetch + save workouts. Same return convention as sync_metrics."""
+    with sync_lock(user, WORKOUTS, wait) as state:
+        if state is None:
+            return None
+
+        start_date = _window_start(state, days, full)
+        pages = OuraService(access_token).iter_workouts(days=days, start_date=start_date)
+        return _save_workouts(user, state, pages)
+
+
+def sync_heartrate(user, access_token, days=7, full=False, wait=0):
+    """Fetch + pack heart-rate samples (services/heartrate.py). Returns days written."""
+    with sync_lock(user, HEARTRATE, wait) as state:
+        if state is None:
+            return None
+
+        end_date = datetime.now().date()
+        start_date = _window_start(state, days, full) or end_date - timedelta(days=days)
+        return _save_heartrate(user, state, access_token, start_date, end_date)
+
+
+def sync_days(user, access_token, endpoint, start_date, end_date):
+    """
+    Re-fetch just start_date..end_date for one data set (webhook refreshes).
+    Doesn't move the high-water mark - days before the window still need the
+    regular sync. Returns rows saved, or None if a sync already had the lock.
+    """
+    state = try_lock(user, endpoint)
+    if state is None:
+        return None
+    try:
+        oura = OuraService(access_token)
+        if endpoint == METRICS:
+            chunks = oura.iter_metrics(start_date=start_date, end_date=end_date)
+            return _save_metrics(user, state, chunks, advance=False)
+        if endpoint == HEARTRATE:
+            return _save_heartrate(user, state, access_token, start_date, end_date, advance=False)
+        pages = oura.iter_workouts(start_date=start_date, end_date=end_date)
+        return _save_workouts(user, state, pages, advance=False)
+    finally:
+        release_lock(state)
+
+
+async def async_sync_metrics(user, access_token, days=30, full=False, wait=0):
+    """sync_metrics for the async views - the Oura fetch doesn't hold a thread"""
+    state = await _async_lock(user, METRICS, wait)
+    if state is None:
+        return None
+    try:
+        start_date = _window_start(state, days, full)
+        data = await OuraService(access_token).afetch_metrics(days=days, start_date=start_date)
+        return await sync_to_async(_save_metrics)(user, state, [data])
+    finally:
+        await sync_to_async(release_lock)(state)
+
+
+async def async_sync_workouts(user, access_token, days=30, full=False, wait=0):
+    state = await _async_lock(user, WORKOUTS, wait)
+    if state is None:
+        return None
+    try:
+        start_date = _window_start(state, days, full)
+        workout_data = await OuraService(access_token).afetch_workouts(
+            days=days, start_date=start_date, raise_errors=True
+        )
+        return await sync_to_async(_save_workouts)(user, state, [workout_data])
+    finally:
+        await sync_to_async(release_lock)(state)
+
+
+def last_synced_at(user, endpoint):
+    return SyncState.objects.filter(
+        user=user, endpoint=endpoint
+    ).values_list('last_synced_at', flat=True).first()
+
+
+async def alast_synced_at(user, endpoint):
+    return await SyncState.objects.filter(
+        user=user, endpoint=endpoint
+    ).values_list('last_synced_at', flat=True).afirst()
+
+
+@contextmanager
+def sync_lock(user, endpoint, wait=0):
+    """
+    Yields the locked SyncState, or None if a sync was already running.
+    The lock is a conditional UPDATE so it works across processes on SQLite
+    and Postgres alike; locked_until expiring covers crashed workers.
+    """
+    state = try_lock(user, endpoint)
+    if state is None:
+        # piggyback on the running sync instead of fetching the same days again
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline and _is_locked(user, endpoint):
+            time.sleep(0.25)
+        yield None
+        return
+
+    try:
+        yield state
+    finally:
+        release_lock(state)
+
+
+def try_lock(user, endpoint):
+    """Non-blocking half of sync_lock: the locked SyncState, or None"""
+    state, _ = SyncState.objects.get_or_create(user=user, endpoint=endpoint)
+    now = timezone.now()
+    acquired = SyncState.objects.filter(pk=state.pk).filter(
+        Q(locked_until__isnull=True) | Q(locked_until__lt=now)
+    ).update(locked_until=now + timedelta(seconds=settings.OURA_SYNC_LOCK_SECONDS))
+
+    if not acquired:
+        return None
+    state.refresh_from_db()
+    return state
+
+
+def release_lock(state):
+    SyncState.objects.filter(pk=state.pk).update(locked_until=None)
+
+
+async def _async_lock(user, endpoint, wait):
+    # same as sync_lock, but the wait is an asyncio.sleep instead of a blocked thread
+    state = await sync_to_async(try_lock)(user, endpoint)
+    if state is None:
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline and await sync_to_async(_is_locked)(user, endpoint):
+            await asyncio.sleep(0.25)
+    return state
+
+
+def _is_locked(user, endpoint):
+    return SyncState.objects.filter(
+        user=user, endpoint=endpoint, locked_until__gte=timezone.now()
+    ).exists()
+
+
+def _save_metrics(user, state, chunks, advance=True):
+    # chunks are fetched lazily, so a failure can come after some were saved:
+    # the mark only advances once they all are, but the cache goes either way
+    try:
+        count = persistence.upsert_metrics_chunks(user, chunks)
+        if advance:
+            _advance(state)
+    finally:
+        # coach summary too - it's keyed on the metrics, a new one may be precomputed
+        response_cache.invalidate(
+            user.id, response_cache.METRICS, response_cache.METRICS_SUMMARY, response_cache.COACH_SUMMARY
+        )
+    return count
+
+
+def _save_workouts(user, state, pages, advance=True):
+    try:
+        count = persistence.upsert_workouts_chunks(user, pages)
+        if advance:
+            _advance(state)
+    finally:
+        response_cache.invalidate(user.id, response_cache.WORKOUTS)
+    return count
+
+
+def _save_heartrate(user, state, access_token, start_date, end_date, advance=True):
+    # pages stream in; ingest groups them into day blocks (one sync window at most)
+    pages = OuraService(access_token).iter_heartrate(start_date, end_date)
+    samples = (sample for page in pages for sample in page)
+    try:
+        count = heartrate.ingest(user, samples, start_date, end_date)
+        if advance:
+            _advance(state)
+    finally:
+        response_cache.invalidate(user.id, response_cache.HEARTRATE)
+    return count
+
+
+def _window_start(state, days, full):
+    """None means 'use the full days window'"""
+    if full or not state.last_synced_day:
+        return None
+
+    # same clock as OuraService so the windows line up
+    today = datetime.now().date()
+    start = state.last_synced_day - timedelta(days=settings.OURA_SYNC_OVERLAP_DAYS)
+    # never ask for more than a full sync would
+    return max(start, today - timedelta(days=days))
+
+
+def _advance(state):
+    state.last_synced_day = datetime.now().date()
+    state.last_synced_at = timezone.now()
+    state.save(update_fields=['last_synced_day', 'last_synced_at'])
@@ -0,0 +1,224 @@
+"""
+Oura webhooks: push notifications instead of polling.
+
+Oura POSTs {event_type, data_type, object_id, event_time, user_id} to
+/api/oura/webhook/ whenever a document changes, signed with our client
+secret (x-oura-signature = HMAC-SHA256 of x-oura-timestamp + body, hex).
+Each event becomes a SyncRequest for that user / data set / day, and
+oura_sync drains the queue with small incremental fetches. With
+OURA_WEBHOOKS_ENABLED the views trust the DB between events instead of
+re-polling Oura on a timer.
+
+Subscriptions are managed with manage.py oura_webhooks; for local testing
+manage.py oura_webhook_simulate posts signed sample events.
+"""
+import hashlib
+import hmac
+import sys
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import F, Max, Min
+from django.utils import timezone
+
+from ..models import SyncRequest, UserProfile, Workout
+from .http_clients import get_oura_session
+from .sync_service import METRICS, WORKOUTS
+from . import response_cache, sync_service
+
+
+# Oura data types we store, and the SyncState data set each one refreshes
+DATA_TYPES = {
+    'sleep': METRICS,
+    'daily_sleep': METRICS,
+    'daily_readiness': METRICS,
+    'daily_activity': METRICS,
+    'workout': WORKOUTS,
+}
+EVENT_TYPES = ('create', 'update', 'delete')
+
+# failed refreshes are retried after RETRY_BASE_DELAY, doubling up to
+# RETRY_MAX_DELAY (seconds); after MAX_ATTEMPTS they're dropped and left to
+# the regular poll
+MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = 60
+RETRY_MAX_DELAY = 3600
+
+
+def sign(body, timestamp, secret=None):
+    """Signature Oura would send for this body (also used by the simulator)"""
+    secret = secret or settings.OURA_CLIENT_SECRET
+    return hmac.new(secret.encode(), timestamp.encode() + body, hashlib.sha256).hexdigest().upper()
+
+
+def verify_signature(body, timestamp, signature):
+    if not settings.OURA_CLIENT_SECRET or not timestamp or not signature:
+        return False
+    # old signed requests can't be replayed
+    sent_at = _parse_timestamp(timestamp)
+    if sent_at is None or abs(time.time() - sent_at) > settings.OURA_WEBHOOK_MAX_SKEW:
+        return False
+    return hmac.compare_digest(sign(body, timestamp), signature.upper())
+
+
+def verify_token(token):
+    """The verification_token Oura echoes back when a subscription is created"""
+    expected = settings.OURA_WEBHOOK_VERIFICATION_TOKEN
+    return bool(expected) and hmac.compare_digest(expected, token or '')
+
+
+def handle_event(event):
+    """
+    Queue the refresh for one event. Returns the (endpoint, day) queued, or
+    None for events we don't store or users we don't know.
+    """
+    endpoint = DATA_TYPES.get(event.get('data_type'))
+    user_id = event.get('user_id')
+    if endpoint is None or not user_id:
+        return None
+
+    profile = UserProfile.objects.filter(oura_user_id=user_id).select_related('user').first()
+    if profile is None:
+        return None
+    user = profile.user
+
+    if event.get('event_type') == 'delete' and endpoint == WORKOUTS:
+        # nothing to re-fetch - the document is gone
+        Workout.objects.filter(user=user, oura_id=event.get('object_id')).delete()
+        response_cache.invalidate(user.id, response_cache.WORKOUTS)
+        return None
+
+    day = _event_day(event)
+    enqueue(user, endpoint, day)
+    return endpoint, day
+
+
+def enqueue(user, endpoint, day):
+    # one row per day; a repeat event just bumps requested_at
+    SyncRequest.objects.bulk_create(
+        [SyncRequest(user=user, endpoint=endpoint, day=day, requested_at=timezone.now())],
+        update_conflicts=True,
+        unique_fields=['user', 'endpoint', 'day'],
+        update_fields=['requested_at'],
+    )
+
+
+def drain(report=None):
+    """
+    Run every queued refresh: one fetch per user and data set covering all
+    its queued days. Returns (refreshed, skipped, failed) group counts.
+    Skipped groups stay queued for the next pass; failed ones back off and
+    are dropped after MAX_ATTEMPTS. Failures are passed to report (e.g. a
+    command's stderr.write), stderr by default.
+    """
+    report = report or _stderr
+    now = timezone.now()
+    groups = list(
+        SyncRequest.objects.values('user', 'endpoint')
+        .annotate(
+            first_day=Min('day'), last_day=Max('day'), latest=Max('requested_at'),
+            attempts=Max('attempts'), retry_after=Max('retry_after'),
+        )
+    )
+    refreshed = skipped = failed = 0
+
+    for group in groups:
+        if group['retry_after'] and group['retry_after'] > now:
+            continue  # backing off after a failure
+        # only what we've seen - an event arriving mid-fetch stays queued
+        queued = SyncRequest.objects.filter(
+            user_id=group['user'], endpoint=group['endpoint'], requested_at__lte=group['latest']
+        )
+        profile = UserProfile.objects.filter(user_id=group['user']).select_related('user').first()
+        if profile is None or not profile.oura_access_token:
+            queued.delete()  # disconnected since
+            continue
+
+        # event_time is when Oura changed the document, and a document's day
+        # can be a little earlier (sleep, late re-scores) - same overlap as syncs
+        start = group['first_day'] - timedelta(days=settings.OURA_SYNC_OVERLAP_DAYS)
+        try:
+            saved = sync_service.sync_days(
+                profile.user, profile.oura_access_token, group['endpoint'], start, group['last_day']
+            )
+        except Exception as e:
+            failed += 1
+            attempts = group['attempts'] + 1
+            if attempts >= MAX_ATTEMPTS:
+                queued.delete()
+                report(f"{profile.user.username}: {group['endpoint']} webhook refresh failed "
+                       f"{attempts} times, giving up (the regular sync will catch up): {e}")
+                continue
+            delay = min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+            queued.update(attempts=F('attempts') + 1, retry_after=now + timedelta(seconds=delay))
+            report(f"{profile.user.username}: {group['endpoint']} webhook refresh failed, "
+                   f"retrying in {delay}s: {e}")
+            continue
+
+        if saved is None:
+            skipped += 1  # a sync had the lock - next pass
+            continue
+        queued.delete()
+        refreshed += 1
+
+    return refreshed, skipped, failed
+
+
+# subscription management (manage.py oura_webhooks)
+
+def list_subscriptions():
+    return _subscription_api('GET')
+
+
+def subscribe(callback_url, data_type, event_type):
+    return _subscription_api('POST', json={
+        'callback_url': callback_url,
+        'verification_token': settings.OURA_WEBHOOK_VERIFICATION_TOKEN,
+        'event_type': event_type,
+        'data_type': data_type,
+    })
+
+
+def renew(subscription_id):
+    return _subscription_api('PUT', f'/renew/{subscription_id}')
+
+
+def unsubscribe(subscription_id):
+    return _subscription_api('DELETE', f'/{subscription_id}')
+
+
+def _subscription_api(method, path='', **kwargs):
+    # app-level credentials, not a user's token
+    headers = {
+        'x-client-id': settings.OURA_CLIENT_ID,
+        'x-client-secret': settings.OURA_CLIENT_SECRET,
+    }
+    response = get_oura_session().request(
+        method, f'{settings.OURA_WEBHOOK_API}{path}', headers=headers, timeout=10, **kwargs
+    )
+    response.raise_for_status()
+    return response.json() if response.content else None
+
+
+def _stderr(message):
+    print(message, file=sys.stderr)
+
+
+def _parse_timestamp(value):
+    # unix seconds, or ISO 8601 to be safe
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+
+def _event_day(event):
+    try:
+        return datetime.fromisoformat(event['event_time']).date()
+    except (KeyError, TypeError, ValueError):
+        return timezone.now().date()
@@ -1,3 +1,169 @@
-from django.test import TestCase
+import time
+from datetime import date
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, override_settings
+
+from . import async_views
+from .models import AIInsight, HeartRateBlock, OuraMetric, UserProfile
+from .services import heartrate, http_clients, payloads, webhooks
+from .services.openai_service import OpenAIService
+
+
+class HotQueryPlanTests(TestCase):
+    """The hot list/lookup queries stay on the indexes from 0007_hot_query_indexes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='plan')
+
+    def workout_queries(self):
+        fields = payloads.WORKOUT_API_FIELDS
+        return [
+            payloads._workouts_page_query(self.user, 20, None, None, fields, None),
+            payloads._workouts_page_query(self.user, 20, None, None, fields, '2024-01-01_5'),
+        ]
+
+    def metric_queries(self):
+        fields = payloads.METRIC_FIELDS
+        return [
+            payloads._metrics_page_query(self.user, 30, None, None, fields, None),
+            payloads._metrics_page_query(self.user, 30, '2024-01-01', '2024-03-01', fields, '2024-02-01'),
+        ]
+
+    def latest_insight_query(self):
+        return AIInsight.objects.filter(
+            user=self.user, insight_type='coach_summary'
+        ).order_by('-created_at')[:1]
+
+    def metric_unique_index(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, OuraMetric._meta.db_table)
+        return next(
+            name for name, info in constraints.items()
+            if info['unique'] and info['columns'] == ['user_id', 'date']
+        )
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite query plan')
+    def test_sqlite_plans_use_indexes(self):
+        for qs in self.workout_queries():
+            plan = qs.explain()
+            self.assertIn('USING INDEX workout_user_day_idx', plan)
+            # (day, id) is the keyset order, so the index covers it with no sort
+            self.assertNotIn('TEMP B-TREE', plan)
+
+        for qs in self.metric_queries():
+            plan = qs.explain()
+            # the unique (user, date) index from unique_together
+            self.assertIn(f'USING INDEX {self.metric_unique_index()}', plan)
+            self.assertNotIn('TEMP B-TREE', plan)
+
+        plan = self.latest_insight_query().explain()
+        self.assertIn('USING INDEX insight_user_type_created_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    @skipUnless(connection.vendor == 'postgresql', 'Postgres query plan')
+    def test_postgres_plans_use_indexes(self):
+        # the test tables are empty, so make the planner show what it would pick with data
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        for qs in self.workout_queries():
+            self.assertIn('workout_user_day_idx', qs.explain())
+        for qs in self.metric_queries():
+            self.assertIn(self.metric_unique_index(), qs.explain())
+        self.assertIn('insight_user_type_created_idx', self.latest_insight_query().explain())
+
+
+@override_settings(OPENAI_API_KEY='test-key')
+class SharedOpenAIClientTests(SimpleTestCase):
+    def setUp(self):
+        http_clients.close_openai_client()
+        self.addCleanup(http_clients.close_openai_client)
+
+    def test_services_share_one_transport(self):
+        first, second = OpenAIService(), OpenAIService()
+        self.assertIs(first.client, second.client)
+        # the OpenAI client keeps its httpx client on _client
+        self.assertIs(first.client._client, second.client._client)
+        self.assertIs(first.client._client, http_clients.openai_transport())
+
+
+class HeartRateIngestTests(TestCase):
+    def test_repeated_day_is_merged(self):
+        user = User.objects.create(username='hr')
+        samples = (
+            [{'timestamp': f'2024-01-02T00:{m:02d}:00+00:00', 'bpm': 60} for m in range(12)]
+            + [{'timestamp': '2024-01-03T00:00:00+00:00', 'bpm': 70}]
+            + [{'timestamp': f'2024-01-02T01:{m:02d}:00+00:00', 'bpm': 80} for m in range(10)]
+        )
+        self.assertEqual(heartrate.ingest(user, samples), 2)
+
+        block = HeartRateBlock.objects.get(user=user, day=date(2024, 1, 2))
+        offsets, bpms = heartrate.decode(block.offsets, block.bpm)
+        self.assertEqual(block.samples, 22)
+        self.assertEqual(offsets, sorted(offsets))
+        self.assertEqual((block.min_bpm, block.max_bpm), (60, 80))
+
+
+class ExportViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(username='export')
+        UserProfile.objects.update_or_create(user=user, defaults={'oura_access_token': 'token'})
+        OuraMetric.objects.create(user=user, date=date(2024, 1, 1), hrv=48)
+
+    def test_wsgi_body_is_sync(self):
+        response = self.client.get('/api/export/?fields=date,hrv')
+        self.assertFalse(response.is_async)
+        self.assertEqual(b''.join(response.streaming_content).count(b'\n'), 3)
+
+    async def test_asgi_body_is_async(self):
+        # a sync body would be buffered whole under ASGI
+        response = await self.async_client.get('/api/export/?fields=date,hrv')
+        self.assertTrue(response.is_async)
+        lines = [line async for line in response.streaming_content]
+        self.assertEqual(lines[-1], b'{"done":true,"rows":1}\n')
+
+
+class AsyncViewBodyTests(SimpleTestCase):
+    async def test_non_object_json_is_rejected(self):
+        factory = AsyncRequestFactory()
+        for view, path in ((async_views.coach_summary_view, '/api/coach-summary/'),
+                           (async_views.chat_view, '/api/chat/')):
+            for body in ('[1]', '"x"', '5'):
+                response = await view(factory.post(path, data=body, content_type='application/json'))
+                self.assertEqual(response.status_code, 400, (path, body))
+
+
+@override_settings(OURA_CLIENT_SECRET='test-secret')
+class OuraWebhookViewTests(TestCase):
+    def post(self, body):
+        timestamp = str(int(time.time()))
+        return self.client.post(
+            '/api/oura/webhook/', data=body, content_type='application/json',
+            HTTP_X_OURA_TIMESTAMP=timestamp, HTTP_X_OURA_SIGNATURE=webhooks.sign(body, timestamp),
+        )
+
+    def test_signed_scalar_body_is_rejected(self):
+        for body in (b'5', b'"event"', b'null'):
+            self.assertEqual(self.post(body).status_code, 400)
+
+    def test_unknown_events_are_acknowledged(self):
+        response = self.post(b'[5, {"data_type": "tag"}]')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'queued': 0})
+
+
+@override_settings(OPENAI_API_KEY='test-key')
+class ChatStreamViewTests(TestCase):
+    def test_wsgi_stream_is_not_buffered(self):
+        user = User.objects.create(username='chat')
+        UserProfile.objects.update_or_create(user=user, defaults={'oura_access_token': 'token'})
+        with mock.patch.object(OpenAIService, 'iter_chat_response', return_value=iter(['Hi', ' there'])):
+            response = self.client.post('/api/chat/?stream=1', {'message': 'hello'}, content_type='application/json')
+            # an async body would be drained up front under WSGI
+            self.assertFalse(response.is_async)
+            body = b''.join(response.streaming_content).decode()
+        self.assertEqual(body, 'data: {"delta": "Hi"}\n\ndata: {"delta": " there"}\n\nevent: done\ndata: {}\n\n')
@@ -1,21 +1,51 @@
+from django.conf import settings
 from django.urls import path
 from .views import (
     MetricsView,
+    MetricsSummaryView,
     WorkoutsView,
     CoachSummaryView,
     TrendInsightView,
     ChatView,
     ConnectOuraView,
+    ExportView,
+    HeartRateView,
+    OuraWebhookView,
+    StatsView,
 )
+from . import async_views
+
+if settings.ASYNC_VIEWS:
+    # same routes, async implementations (see api/async_views.py)
+    metrics_view = async_views.metrics_view
+    workouts_view = async_views.workouts_view
+    coach_summary_view = async_views.coach_summary_view
+    trend_insight_view = async_views.trend_insight_view
+    chat_view = async_views.chat_view
+    export_view = async_views.export_view
+else:
+    metrics_view = MetricsView.as_view()
+    workouts_view = WorkoutsView.as_view()
+    coach_summary_view = CoachSummaryView.as_view()
+    trend_insight_view = TrendInsightView.as_view()
+    chat_view = ChatView.as_view()
+    export_view = ExportView.as_view()
 
 urlpatterns = [
     # Oura data endpoints
-    path('metrics/', MetricsView.as_view(), name='metrics'),
-    path('workouts/', WorkoutsView.as_view(), name='workouts'),
+    path('metrics/', metrics_view, name='metrics'),
+    path('metrics/summary/', MetricsSummaryView.as_view(), name='metrics-summary'),
+    path('workouts/', workouts_view, name='workouts'),
+    path('heartrate/', HeartRateView.as_view(), name='heartrate'),  # downsampled 5-min samples
     path('connect-oura/', ConnectOuraView.as_view(), name='connect-oura'),
+    path('export/', export_view, name='export'),  # full history, columnar NDJSON
+    path('oura/webhook/', OuraWebhookView.as_view(), name='oura-webhook'),  # Oura pushes changes here
     
     # AI features
-    path('coach-summary/', CoachSummaryView.as_view(), name='coach-summary'),
-    path('trend-insight/', TrendInsightView.as_view(), name='trend-insight'),
-    path('chat/', ChatView.as_view()),  # rate limiting needed
+    path('coach-summary/', coach_summary_view, name='coach-summary'),
+    path('trend-insight/', trend_insight_view, name='trend-insight'),
+    path('chat/', chat_view),  # rate limiting needed
+    
+    # internal
+    path('stats/', StatsView.as_view(), name='stats'),
 ]
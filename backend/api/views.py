@@ -5,9 +5,14 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.decorators import api_view, permission_classes
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from datetime import timedelta
-from .models import OuraMetric, UserProfile, AIInsight
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import json
+from .models import OuraMetric, UserProfile
 from .serializers import (
     OuraMetricSerializer,
     CoachSummaryResponseSerializer,
@@ -16,9 +21,20 @@ from .serializers import (
 )
 from .services.oura_service import OuraService
 from .services.openai_service import OpenAIService
+from .services import sync_service
+from .services.http_clients import oura_connection_stats
+from .services.rate_limit import retry_stats
+from .services import response_cache, single_flight, aggregation, rollups, insights, llm_usage, export, payloads, webhooks, heartrate
 import logging  # might use this for better error tracking later
 
-# from django.core.cache import cache  # TODO: use Redis instead of DB caching
+
+def _is_stale(synced_at):
+    if synced_at is None:
+        return True
+    if settings.OURA_WEBHOOKS_ENABLED:
+        # Oura pushes changes (services/webhooks.py), so the DB is current until told otherwise
+        return False
+    return synced_at < timezone.now() - timedelta(seconds=settings.OURA_SYNC_STALE_AFTER)
 
 
 class MetricsView(APIView):
@@ -46,53 +62,101 @@ class MetricsView(APIView):
         # Check if force refresh requested
         force_refresh = request.query_params.get('force', 'false').lower() == 'true'
         
-        # check cache first (1 hour TTL) unless force refresh
+        # ?limit=&cursor= (keyset paging, newest first), ?start=&end=, ?fields=
+        try:
+            page = payloads.parse_metrics_params(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, 400)
+        variant = payloads.page_variant(page)
+        # taken before the DB read, so a sync landing mid-request can't be cached over
+        cache_key = response_cache.key(user.id, response_cache.METRICS, variant)
+        
         if not force_refresh:
-            one_hour_ago = timezone.now() - timedelta(hours=1)
-            recent_metrics = OuraMetric.objects.filter(
-                user=user,
-                updated_at__gte=one_hour_ago
-            ).order_by('-date')[:30]  # get 30 for the toggle
-            
-            if recent_metrics.count() >= 7:  # cache hit
-                serializer = OuraMetricSerializer(recent_metrics, many=True)
-                return Response({'metrics': serializer.data})
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                return Response(cached)
+        
+        # the oura_sync worker keeps the DB fresh, so normally this is a pure read.
+        # Only hit Oura inline on a manual refresh or when nothing has synced
+        # for a while (worker not running)
+        synced_at = sync_service.last_synced_at(user, sync_service.METRICS)
+        if force_refresh or _is_stale(synced_at):
+            try:
+                # concurrent misses for this user share one Oura fetch
+                single_flight.do(f'sync:metrics:{user.id}', lambda: sync_service.sync_metrics(
+                    user, profile.oura_access_token, days=30,
+                    wait=settings.OURA_SYNC_LOCK_WAIT
+                ))
+                synced_at = sync_service.last_synced_at(user, sync_service.METRICS)
+            except Exception as e:
+                # Log this somewhere eventually
+                return Response({'error': f'Oura API error: {str(e)}'}, 500)
+        
+        # plain .values() dicts - no model instances or serializer per row
+        rows, next_cursor = payloads.metrics_page(user, **page)
+        payload = {'metrics': rows, 'next_cursor': next_cursor, 'synced_at': synced_at}
+        # TTL is shorter than the stale window so the staleness check still runs
+        response_cache.store(cache_key, payload, settings.RESPONSE_CACHE_TTL)
+        return Response(payload)
+
+
+class MetricsSummaryView(APIView):
+    """
+    Averages, trends and patterns for the last ?window=N days (default 7),
+    plus rolling 7/30/90-day means. Replaces the reductions App.jsx used to do.
+    Optional ?tz=Area/City so the average bedtime is in the user's local time.
+    rolling_stats carries the full DailyStatistic rows for the latest day.
+    """
+    permission_classes = [AllowAny]
+    
+    def get(self, request):
+        profile = UserProfile.objects.filter(
+            oura_access_token__isnull=False
+        ).exclude(oura_access_token='').select_related('user').first()
+        
+        if not profile:
+            return Response({'error': 'No Oura account connected'}, 400)
+        
+        user = profile.user
         
-        # cache miss or force refresh - fetch from oura
         try:
-            oura = OuraService(profile.oura_access_token)
-            data = oura.fetch_metrics(days=30)  # fetch 30 days
-            # print(f"Fetched {len(data)} days from Oura")  # debug
-            
-            # save to db
-            saved_metrics = []
-            for item in data:
-                # could use bulk_create but this works fine
-                metric, _ = OuraMetric.objects.update_or_create(
-                    user=user,
-                    date=item['date'],
-                    defaults={
-                        'readiness_score': item.get('readiness_score'),
-                        'sleep_score': item.get('sleep_score'),
-                        'activity_score': item.get('activity_score'),
-                        'sleep_duration': item.get('sleep_duration'),
-                        'deep_sleep': item.get('deep_sleep'),
-                        'rem_sleep': item.get('rem_sleep'),
-                        'bedtime_start': item.get('bedtime_start'),
-                        'hrv': item.get('hrv'),
-                        'resting_hr': item.get('resting_hr'),
-                        'steps': item.get('steps'),
-                        'active_calories': item.get('active_calories'),
-                    }
-                )
-                saved_metrics.append(metric)
-            
-            serializer = OuraMetricSerializer(saved_metrics, many=True)
-            return Response({'metrics': serializer.data})
-            
-        except Exception as e:
-            # Log this somewhere eventually
-            return Response({'error': f'Oura API error: {str(e)}'}, 500)
+            window = int(request.query_params.get('window', 7))
+        except ValueError:
+            return Response({'error': 'window must be a number of days'}, 400)
+        if not 1 <= window <= 365:
+            return Response({'error': 'window must be between 1 and 365'}, 400)
+        
+        tz_name = request.query_params.get('tz', '')
+        try:
+            tz = ZoneInfo(tz_name) if tz_name else None
+        except (ZoneInfoNotFoundError, ValueError):
+            return Response({'error': f'Unknown timezone: {tz_name}'}, 400)
+        
+        variant = f'{window}:{tz_name}'
+        cache_key = response_cache.key(user.id, response_cache.METRICS_SUMMARY, variant)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return Response(cached)
+        
+        # rolling 7/30/90 come precomputed from DailyStatistic when we have them,
+        # so only the requested window has to be scanned
+        stored = rollups.latest(user)
+        rolling = () if stored else aggregation.ROLLING_WINDOWS
+        
+        horizon = max((window,) + rolling)
+        rows = OuraMetric.objects.filter(user=user).order_by('-date').values(
+            'date', 'bedtime_start', *aggregation.AVG_FIELDS
+        )[:horizon]  # at most one row per day
+        
+        summary = aggregation.summarize(rows, window=window, rolling=rolling, tz=tz)
+        if stored:
+            summary['rolling'] = {
+                w: {field: s['mean'] for field, s in stats.items()}
+                for w, stats in stored.items()
+            }
+        summary['rolling_stats'] = stored  # std/min/max/delta, None until the first sync
+        response_cache.store(cache_key, summary, settings.RESPONSE_CACHE_TTL)
+        return Response(summary)
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -112,41 +176,34 @@ class CoachSummaryView(APIView):
         except Exception as e:
             return Response({'error': str(e)}, 500)
         
-        metrics = OuraMetric.objects.filter(user=user).order_by('-date')[:7]
+        # Check if force regeneration is requested
+        force_regenerate = request.data.get('force', False)
+        cache_key = response_cache.key(user.id, response_cache.COACH_SUMMARY)
         
-        if not metrics:
-            return Response({'error': 'No metrics available'}, 400)
+        if not force_regenerate:
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                return Response(cached)
         
-        metrics_data = OuraMetricSerializer(metrics, many=True).data
+        metrics_data = insights.recent_metrics(user)
         
-        # Check if force regeneration is requested
-        force_regenerate = request.data.get('force', False)
+        if not metrics_data:
+            return Response({'error': 'No metrics available'}, 400)
         
-        # Check if we generated insights recently (skip if force=true)
+        # oura_insights precomputes these - serve it if the metrics haven't
+        # moved since, however old it is (skip if force=true)
+        fingerprint = insights.metrics_fingerprint(metrics_data)
         if not force_regenerate:
-            cached = AIInsight.objects.filter(
-                user=user,
-                insight_type='coach_summary',
-                created_at__gte=timezone.now() - timedelta(hours=1)
-            ).first()
-            
-            if cached:
-                # cached format could be old (explanation/suggestions) or new (full JSON in suggestions)
-                if cached.suggestions and isinstance(cached.suggestions, dict) and 'summary' in cached.suggestions:
-                    return Response(cached.suggestions)
-        
-        # Generate new insights
-        ai = OpenAIService()
-        result = ai.generate_coach_summary(metrics_data)
-        
-        # Save full result in suggestions field
-        AIInsight.objects.create(
-            user=user,
-            insight_type='coach_summary',
-            explanation='',  # empty for new format
-            suggestions=result
-        )
+            stored = insights.precomputed(user, insights.COACH_SUMMARY, fingerprint)
+            if stored:
+                response_cache.store(cache_key, stored, insights.COACH_SUMMARY_TTL)
+                return Response(stored)
         
+        # several tabs loading at once only pay for one LLM call
+        result = single_flight.do(f'coach_summary:{user.id}', lambda: insights.generate(
+            user, insights.COACH_SUMMARY, metrics_data, fingerprint,
+            use_cache=not force_regenerate
+        ))
         return Response(result)
 
 
@@ -166,16 +223,21 @@ class TrendInsightView(APIView):
         except Exception as e:
             return Response({'error': str(e)}, 500)
         
-        metrics = OuraMetric.objects.filter(user=user).order_by('-date')[:7]
+        data = insights.recent_metrics(user)
         
-        if not metrics:
+        if not data:
             return Response({'error': 'No metrics'}, 400)
         
-        data = OuraMetricSerializer(metrics, many=True).data
+        # precomputed by oura_insights unless the metrics changed since
+        fingerprint = insights.metrics_fingerprint(data)
+        stored = insights.precomputed(user, insights.TREND_INSIGHT, fingerprint)
+        if stored:
+            return Response(stored)
         
-        # No caching here - trends change frequently enough
-        ai = OpenAIService()
-        result = ai.generate_trend_insight(data)
+        # concurrent requests share one generation
+        result = single_flight.do(f'trend_insight:{user.id}', lambda: insights.generate(
+            user, insights.TREND_INSIGHT, data, fingerprint
+        ))
         return Response(result)
 
 
@@ -213,6 +275,21 @@ class ChatView(APIView):
         
         try:
             ai = OpenAIService()
+            
+            # ?stream=1 relays tokens as Server-Sent Events. Under ASGI the body is
+            # an async generator, so it runs on the event loop instead of holding
+            # a worker thread; under WSGI Django would buffer that, so it gets
+            # the sync generator over the pooled client instead
+            if request.query_params.get('stream', '').lower() in ('1', 'true'):
+                if _served_by_asgi(request):
+                    events = _chat_event_stream(ai, msg, metrics_data)
+                else:
+                    events = _chat_event_stream_sync(ai, msg, metrics_data)
+                response = StreamingHttpResponse(events, content_type='text/event-stream')
+                response['Cache-Control'] = 'no-cache'
+                response['X-Accel-Buffering'] = 'no'  # stop nginx buffering the stream
+                return response
+            
             result = ai.generate_chat_response(msg, metrics_data)
             return Response(result)
         except Exception as e:
@@ -221,6 +298,47 @@ class ChatView(APIView):
             return Response({'error': str(e)}, 500)
 
 
+def _served_by_asgi(request):
+    # DRF wraps the Django request; ASGIHandler builds an ASGIRequest
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+_SSE_DONE = "event: done\ndata: {}\n\n"
+
+
+def _sse_delta(delta):
+    return f"data: {json.dumps({'delta': delta})}\n\n"
+
+
+def _sse_error(e):
+    # headers are already sent, so errors have to go down the stream
+    print(f"Chat stream error: {e}")
+    fallback = "I'm having trouble processing that question right now. Please try again."
+    return f"event: error\ndata: {json.dumps({'response': fallback})}\n\n"
+
+
+async def _chat_event_stream(ai, message, metrics_data):
+    """SSE framing: a `data: {"delta": ...}` event per chunk, then `event: done`"""
+    try:
+        async for delta in ai.stream_chat_response(message, metrics_data):
+            yield _sse_delta(delta)
+    except Exception as e:
+        yield _sse_error(e)
+        return
+    yield _SSE_DONE
+
+
+def _chat_event_stream_sync(ai, message, metrics_data):
+    """Same events as _chat_event_stream, for WSGI"""
+    try:
+        for delta in ai.iter_chat_response(message, metrics_data):
+            yield _sse_delta(delta)
+    except Exception as e:
+        yield _sse_error(e)
+        return
+    yield _SSE_DONE
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class ConnectOuraView(APIView):
     """
@@ -241,6 +359,13 @@ class ConnectOuraView(APIView):
         except:
             return Response({'error': 'Invalid token'}, 400)
         
+        # webhook events identify the account by Oura's user id
+        try:
+            oura_user_id = oura.fetch_personal_info().get('id', '')
+        except Exception as e:
+            print(f"Couldn't fetch Oura personal info: {e}")
+            oura_user_id = ''
+        
         # For MVP: use user with metrics, or create for first user
         from django.contrib.auth.models import User
         user = User.objects.filter(metrics__isnull=False).first()
@@ -251,6 +376,7 @@ class ConnectOuraView(APIView):
         profile, _ = UserProfile.objects.get_or_create(user=user)
         profile.oura_access_token = token
         profile.token_created_at = timezone.now()
+        profile.oura_user_id = oura_user_id
         profile.save()
         
         return Response({'message': 'Connected successfully'})
@@ -263,7 +389,6 @@ class WorkoutsView(APIView):
     
     def get(self, request):
         from django.contrib.auth.models import User
-        from api.models import Workout
         
         try:
             # Find user with token
@@ -281,48 +406,162 @@ class WorkoutsView(APIView):
         # Check if we should fetch fresh data
         force_refresh = request.query_params.get('force', 'false').lower() == 'true'
         
-        # Get recent workouts from DB
-        recent_workouts = Workout.objects.filter(user=user).order_by('-day')[:30]
+        # same paging/range/projection params as /api/metrics/
+        try:
+            page = payloads.parse_workouts_params(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, 400)
+        variant = payloads.page_variant(page)
+        cache_key = response_cache.key(user.id, response_cache.WORKOUTS, variant)
         
-        # If no workouts or force refresh, fetch from Oura
-        if not recent_workouts.exists() or force_refresh:
+        if not force_refresh:
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                return Response(cached)
+        
+        synced_at = sync_service.last_synced_at(user, sync_service.WORKOUTS)
+        
+        # If never synced or force refresh, fetch from Oura (worker handles the rest)
+        if synced_at is None or force_refresh:
             try:
-                oura = OuraService(profile.oura_access_token)
-                workout_data = oura.fetch_workouts(days=30)
-                
-                # Save to DB
-                for item in workout_data:
-                    Workout.objects.update_or_create(
-                        oura_id=item['id'],
-                        defaults={
-                            'user': user,
-                            'day': item['day'],
-                            'activity': item.get('activity', 'Unknown'),
-                            'calories': item.get('calories'),
-                            'intensity': item.get('intensity'),
-                            'start_datetime': item.get('start_datetime'),
-                            'end_datetime': item.get('end_datetime'),
-                            'source': item.get('source'),
-                        }
-                    )
-                
-                recent_workouts = Workout.objects.filter(user=user).order_by('-day')[:30]
+                # only pulls the days since the last workout sync
+                single_flight.do(f'sync:workouts:{user.id}', lambda: sync_service.sync_workouts(
+                    user, profile.oura_access_token, days=30,
+                    wait=settings.OURA_SYNC_LOCK_WAIT
+                ))
+                synced_at = sync_service.last_synced_at(user, sync_service.WORKOUTS)
             except Exception as e:
                 return Response({'error': f'Failed to fetch workouts: {str(e)}'}, 500)
         
-        # Serialize and return
-        workouts_list = []
-        for workout in recent_workouts:
-            workouts_list.append({
-                'id': workout.id,
-                'day': workout.day,
-                'activity': workout.activity,
-                'calories': workout.calories,
-                'intensity': workout.intensity,
-                'duration_minutes': workout.duration_minutes,
-                'start_datetime': workout.start_datetime,
-                'end_datetime': workout.end_datetime,
-                'source': workout.source,
-            })
-        
-        return Response({'workouts': workouts_list})
+        # .values() rows with the duration worked out in SQL
+        workouts_list, next_cursor = payloads.workouts_page(user, **page)
+        
+        payload = {'workouts': workouts_list, 'next_cursor': next_cursor, 'synced_at': synced_at}
+        response_cache.store(cache_key, payload, settings.RESPONSE_CACHE_TTL)
+        return Response(payload)
+
+
+class ExportView(APIView):
+    """
+    Full metric/workout history as streamed columnar NDJSON (format in services/export.py).
+    ?resource=metrics|workouts, ?start=&end= (YYYY-MM-DD, inclusive), ?fields=a,b,c
+    """
+    permission_classes = [AllowAny]
+    
+    def get(self, request):
+        profile = UserProfile.objects.filter(
+            oura_access_token__isnull=False
+        ).exclude(oura_access_token='').select_related('user').first()
+        
+        if not profile:
+            return Response({'error': 'No Oura account connected'}, 400)
+        
+        try:
+            resource, fields, start, end = export.parse_params(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, 400)
+        
+        qs = export.queryset(profile.user, resource, fields, start, end)
+        # rows are pulled per chunk instead of loading the whole history; under
+        # ASGI (even with ASYNC_VIEWS off) only an async body actually streams
+        make_body = export.abody if _served_by_asgi(request) else export.body
+        body = make_body(qs, resource, fields, settings.EXPORT_CHUNK_SIZE)
+        response = StreamingHttpResponse(body, content_type='application/x-ndjson')
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+
+class HeartRateView(APIView):
+    """
+    Downsampled heart rate for a date range (services/heartrate.py).
+    ?start=&end= (YYYY-MM-DD, UTC days, default last 7), ?bucket= seconds (default: auto)
+    """
+    permission_classes = [AllowAny]
+    
+    def get(self, request):
+        profile = UserProfile.objects.filter(
+            oura_access_token__isnull=False
+        ).exclude(oura_access_token='').select_related('user').first()
+        
+        if not profile:
+            return Response({'error': 'No Oura account connected'}, 400)
+        user = profile.user
+        
+        try:
+            params = heartrate.parse_params(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, 400)
+        variant = f"{params['start']}:{params['end']}:{params['bucket'] or ''}"
+        
+        cache_key = response_cache.key(user.id, response_cache.HEARTRATE, variant)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return Response(cached)
+        
+        # like workouts: the worker keeps this fresh, only fetch inline the first time
+        synced_at = sync_service.last_synced_at(user, sync_service.HEARTRATE)
+        if synced_at is None:
+            try:
+                single_flight.do(f'sync:heartrate:{user.id}', lambda: sync_service.sync_heartrate(
+                    user, profile.oura_access_token, wait=settings.OURA_SYNC_LOCK_WAIT
+                ))
+                synced_at = sync_service.last_synced_at(user, sync_service.HEARTRATE)
+            except Exception as e:
+                return Response({'error': f'Oura API error: {str(e)}'}, 500)
+        
+        payload = heartrate.series(user, params['start'], params['end'], params['bucket'])
+        payload['synced_at'] = synced_at
+        response_cache.store(cache_key, payload, settings.RESPONSE_CACHE_TTL)
+        return Response(payload)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class OuraWebhookView(APIView):
+    """
+    Oura webhook receiver (services/webhooks.py).
+    GET answers the challenge Oura sends when a subscription is created;
+    POST takes signed events and queues a refresh of the day they touch.
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []  # Oura signs the body instead
+    
+    def get(self, request):
+        challenge = request.query_params.get('challenge')
+        if not challenge or not webhooks.verify_token(request.query_params.get('verification_token')):
+            return Response({'error': 'Invalid verification token'}, 401)
+        return Response({'challenge': challenge})
+    
+    def post(self, request):
+        # the raw bytes, not request.data - the signature is over the exact body
+        body = request.body
+        if not webhooks.verify_signature(
+            body, request.headers.get('x-oura-timestamp'), request.headers.get('x-oura-signature')
+        ):
+            return Response({'error': 'Invalid signature'}, 401)
+        
+        try:
+            events = json.loads(body)
+        except ValueError:
+            return Response({'error': 'Invalid JSON'}, 400)
+        if isinstance(events, dict):
+            events = [events]
+        elif not isinstance(events, list):
+            return Response({'error': 'Expected an event object or a list of events'}, 400)
+        
+        queued = [webhooks.handle_event(event) for event in events if isinstance(event, dict)]
+        # 2xx even for events we ignore, otherwise Oura keeps retrying them
+        return Response({'queued': sum(1 for q in queued if q is not None)})
+
+
+class StatsView(APIView):
+    """Internal counters for checking the perf work under load"""
+    permission_classes = [AllowAny]
+    
+    def get(self, request):
+        return Response({
+            'oura_http': oura_connection_stats(),
+            'oura_retries': retry_stats(),
+            'response_cache': response_cache.cache_stats(),
+            'single_flight': single_flight.single_flight_stats(),
+            'llm_usage': llm_usage.usage_stats(),
+        })
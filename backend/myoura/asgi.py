@@ -13,4 +13,21 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "myoura.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from api.services import http_clients  # noqa: E402 - needs the app registry
+
+
+async def application(scope, receive, send):
+    # Django ignores lifespan events; answer them so the server's shutdown
+    # closes the per-loop async HTTP clients on the loop that owns them
+    if scope['type'] != 'lifespan':
+        return await django_application(scope, receive, send)
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await http_clients.aclose_loop_clients()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
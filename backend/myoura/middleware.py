@@ -1,17 +1,17 @@
 """
 Custom middleware for Oura app
 """
+from django.utils.deprecation import MiddlewareMixin
 
-class DisableCSRFForAPI:
-    """Disable CSRF checks for /api/* endpoints"""
-    
-    def __init__(self, get_response):
-        self.get_response = get_response
+
+class DisableCSRFForAPI(MiddlewareMixin):
+    """
+    Disable CSRF checks for /api/* endpoints
+    MiddlewareMixin makes this async-capable - a sync-only middleware makes
+    Django run every async view behind it through one thread
+    """
     
-    def __call__(self, request):
+    def process_request(self, request):
         # Exempt all /api/* paths from CSRF
         if request.path.startswith('/api/'):
             setattr(request, '_dont_enforce_csrf_checks', True)
-        
-        return self.get_response(request)
-
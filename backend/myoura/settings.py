@@ -57,6 +57,11 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'myoura.wsgi.application'
+ASGI_APPLICATION = 'myoura.asgi.application'
+
+# serve the Oura/OpenAI endpoints from api/async_views.py - ASGI only
+# (e.g. `uvicorn myoura.asgi:application`); myoura/wsgi.py refuses it
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False') == 'True'
 
 # Database
 # For local development with SQLite (easier setup):
@@ -79,6 +84,40 @@ DATABASES = {
 #     }
 # }
 
+# Cache - local memory by default, Redis if REDIS_URL is set (needs `redis`),
+# or a file cache shared by workers on one box via CACHE_DIR
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+elif os.getenv('CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_DIR'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'myoura',
+        }
+    }
+
+# Serialized /api/metrics/ + /api/workouts/ payloads, dropped on every sync
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', '900'))
+
+# Single-flight for concurrent cache misses (Oura syncs, LLM generations)
+SINGLE_FLIGHT_TIMEOUT = int(os.getenv('SINGLE_FLIGHT_TIMEOUT', '60'))  # longest we wait on another worker
+SINGLE_FLIGHT_RESULT_TTL = int(os.getenv('SINGLE_FLIGHT_RESULT_TTL', '30'))
+
+# /api/export/: rows per streamed chunk (and per DB fetch)
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '1000'))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -111,7 +150,8 @@ CSRF_TRUSTED_ORIGINS = [
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        # orjson when installed, stock JSONRenderer otherwise
+        'api.renderers.ORJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
@@ -120,7 +160,59 @@ REST_FRAMEWORK = {
 
 # OpenAI
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+# shared connection pool (HTTP/2 only if the `h2` package is installed)
+OPENAI_MAX_CONNECTIONS = int(os.getenv('OPENAI_MAX_CONNECTIONS', '20'))
+OPENAI_MAX_KEEPALIVE = int(os.getenv('OPENAI_MAX_KEEPALIVE', '10'))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv('OPENAI_KEEPALIVE_EXPIRY', '60'))
+OPENAI_HTTP2 = os.getenv('OPENAI_HTTP2', 'True') == 'True'
+# content-addressed cache of completions (LLMResponse table)
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'True') == 'True'
+LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', str(24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '5000'))
+# per-call token/latency rows (LLMCall) for /api/stats/
+LLM_USAGE_ENABLED = os.getenv('LLM_USAGE_ENABLED', 'True') == 'True'
+# daily rows in prompts: 'text' (labelled lines) or 'csv' (compact table)
+LLM_PROMPT_FORMAT = os.getenv('LLM_PROMPT_FORMAT', 'text')
+# cap on a prompt's user message - the oldest days get dropped past it
+LLM_PROMPT_TOKEN_BUDGET = int(os.getenv('LLM_PROMPT_TOKEN_BUDGET', '1500'))
+# oura_insights: LLM calls in flight at once (keep under OPENAI_MAX_CONNECTIONS)
+INSIGHT_BATCH_WORKERS = int(os.getenv('INSIGHT_BATCH_WORKERS', '4'))
 
 # Oura API
 OURA_API_BASE = 'https://api.ouraring.com/v2/usercollection'
+# endpoints fetched in parallel per metrics refresh (1 = old serial behaviour)
+OURA_FETCH_WORKERS = int(os.getenv('OURA_FETCH_WORKERS', '4'))
+# long metric syncs are fetched, merged and saved this many days at a time
+OURA_FETCH_WINDOW_DAYS = int(os.getenv('OURA_FETCH_WINDOW_DAYS', '90'))
+# shared keep-alive pool (per host) used by every OuraService instance
+OURA_POOL_CONNECTIONS = int(os.getenv('OURA_POOL_CONNECTIONS', '4'))
+OURA_POOL_MAXSIZE = int(os.getenv('OURA_POOL_MAXSIZE', '16'))
+# per-token request budget + retry/backoff on 429 and 5xx
+OURA_RATE_PER_SECOND = float(os.getenv('OURA_RATE_PER_SECOND', '5'))
+OURA_RATE_BURST = int(os.getenv('OURA_RATE_BURST', '10'))
+OURA_MAX_RETRIES = int(os.getenv('OURA_MAX_RETRIES', '4'))
+OURA_RETRY_BASE_DELAY = float(os.getenv('OURA_RETRY_BASE_DELAY', '0.5'))
+OURA_RETRY_MAX_DELAY = float(os.getenv('OURA_RETRY_MAX_DELAY', '30'))
+# incremental syncs re-fetch this many days before the high-water mark (late scores)
+OURA_SYNC_OVERLAP_DAYS = int(os.getenv('OURA_SYNC_OVERLAP_DAYS', '2'))
+# background refresh (manage.py oura_sync) - views only fetch inline past STALE_AFTER
+OURA_SYNC_INTERVAL = int(os.getenv('OURA_SYNC_INTERVAL', '900'))
+OURA_SYNC_STALE_AFTER = int(os.getenv('OURA_SYNC_STALE_AFTER', '3600'))
+OURA_SYNC_LOCK_SECONDS = int(os.getenv('OURA_SYNC_LOCK_SECONDS', '300'))  # crashed worker lock expiry
+OURA_SYNC_LOCK_WAIT = float(os.getenv('OURA_SYNC_LOCK_WAIT', '20'))  # how long ?force=true waits on a running sync
+# oura_backfill: days per checkpointed chunk
+OURA_BACKFILL_CHUNK_DAYS = int(os.getenv('OURA_BACKFILL_CHUNK_DAYS', '30'))
+
+# Oura webhooks: push updates instead of polling (manage.py oura_webhooks subscribes).
+# Client id/secret come from the Oura developer app; the secret also signs events
+OURA_WEBHOOKS_ENABLED = os.getenv('OURA_WEBHOOKS_ENABLED', 'False') == 'True'
+OURA_WEBHOOK_API = 'https://api.ouraring.com/v2/webhook/subscription'
+OURA_CLIENT_ID = os.getenv('OURA_CLIENT_ID', '')
+OURA_CLIENT_SECRET = os.getenv('OURA_CLIENT_SECRET', '')
+OURA_WEBHOOK_VERIFICATION_TOKEN = os.getenv('OURA_WEBHOOK_VERIFICATION_TOKEN', '')
+OURA_WEBHOOK_MAX_SKEW = int(os.getenv('OURA_WEBHOOK_MAX_SKEW', '300'))  # seconds, signed timestamp vs now
+# oura_sync drains webhook refreshes this often; with webhooks on, the full poll
+# only runs every OURA_WEBHOOK_POLL_INTERVAL as a safety net
+OURA_SYNC_QUEUE_INTERVAL = int(os.getenv('OURA_SYNC_QUEUE_INTERVAL', '10'))
+OURA_WEBHOOK_POLL_INTERVAL = int(os.getenv('OURA_WEBHOOK_POLL_INTERVAL', '21600'))
 
@@ -9,8 +9,15 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "myoura.settings")
 
 application = get_wsgi_application()
+
+if settings.ASYNC_VIEWS:
+    # each request would run on a throwaway event loop, with its own async
+    # HTTP clients (see api/services/http_clients.py)
+    raise ImproperlyConfigured('ASYNC_VIEWS needs an ASGI server, e.g. uvicorn myoura.asgi:application')
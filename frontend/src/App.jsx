@@ -8,9 +8,13 @@ import WorkoutCard from './components/WorkoutCard';
 import ChatBox from './components/ChatBox';
 import { apiService } from './services/api';
 
+// the only metric columns the trend chart reads
+const CHART_FIELDS = ['date', 'readiness_score', 'sleep_score', 'activity_score'];
+
 function App() {
   // State
   const [metrics, setMetrics] = useState([]);
+  const [summary, setSummary] = useState(null);
   const [workouts, setWorkouts] = useState([]);
   const [coachSummary, setCoachSummary] = useState(null);
   const [trendInsight, setTrendInsight] = useState(null);
@@ -33,9 +37,15 @@ function App() {
     loadAllData();
   }, []);
 
+  // averages + patterns come from the backend for the selected range,
+  // and the chart only pulls the days/columns it draws
+  useEffect(() => {
+    fetchSummary();
+    fetchMetrics();
+  }, [timeRange]);
+
   const loadAllData = async () => {
     await Promise.all([
-      fetchMetrics(),
       fetchWorkouts(),
       fetchCoachSummary(),
       fetchTrendInsight(),
@@ -45,7 +55,7 @@ function App() {
   const fetchMetrics = async () => {
     setLoading(prev => ({ ...prev, metrics: true }));
     try {
-      const data = await apiService.getMetrics();
+      const data = await apiService.getMetrics(false, { limit: timeRange, fields: CHART_FIELDS });
       setMetrics(data.metrics || []);
       updateLastSynced();
     } catch (error) {
@@ -56,6 +66,16 @@ function App() {
     }
   };
 
+  const fetchSummary = async () => {
+    try {
+      const data = await apiService.getMetricsSummary(timeRange);
+      setSummary(data);
+    } catch (error) {
+      console.error('Error fetching summary:', error);
+      setSummary(null);
+    }
+  };
+
   const fetchWorkouts = async () => {
     setLoading(prev => ({ ...prev, workouts: true }));
     try {
@@ -74,10 +94,11 @@ function App() {
     try {
       // Force fetch fresh data from Oura
       setLoading(prev => ({ ...prev, metrics: true }));
-      const data = await apiService.getMetrics(true); // force=true
+      const data = await apiService.getMetrics(true, { limit: timeRange, fields: CHART_FIELDS }); // force=true
       setMetrics(data.metrics || []);
       updateLastSynced();
       setLoading(prev => ({ ...prev, metrics: false }));
+      await fetchSummary();
       
       // Also regenerate AI insights with fresh data
       await fetchCoachSummary(true);
@@ -146,8 +167,10 @@ function App() {
     setLoading(prev => ({ ...prev, chat: true }));
     setChatResponse('');
     try {
-      const data = await apiService.sendChatMessage(message);
-      setChatResponse(data.response);
+      // tokens show up as they're generated instead of after the whole reply
+      await apiService.streamChatMessage(message, (delta) => {
+        setChatResponse(prev => prev + delta);
+      });
     } catch (error) {
       console.error('Error sending chat:', error);
       setChatResponse("I'm having trouble processing that question right now. Please try again.");
@@ -156,12 +179,10 @@ function App() {
     }
   };
 
-  // backend sends newest first so need slice(0, timeRange) to get recent days
+  // averages come from /metrics/summary/ for the selected range
   const calculateAverage = (scoreKey) => {
-    if (!metrics.length) return 0;
-    const rangeMetrics = metrics.slice(0, timeRange);
-    const total = rangeMetrics.reduce((sum, m) => sum + (m[scoreKey] || 0), 0);
-    return Math.round(total / rangeMetrics.length);
+    const value = summary?.averages?.[scoreKey];
+    return value ? Math.round(value) : 0;
   };
   
   const scores = {
@@ -170,7 +191,7 @@ function App() {
     activity: calculateAverage('activity_score') || 72,
   };
 
-  const patterns = calculatePatterns(metrics.slice(0, timeRange));
+  const patterns = formatPatterns(summary?.patterns);
 
   return (
     <div className="min-h-screen bg-gradient-to-br from-[#667eea] to-[#764ba2] py-12 px-8 pb-24">
@@ -243,7 +264,7 @@ function App() {
           </div>
 
           <TrendChart
-            metrics={metrics.slice(0, timeRange)}
+            metrics={metrics}
             insight={trendInsight}
             loading={loading.trend}
             metricType={selectedMetric}
@@ -299,8 +320,8 @@ function App() {
 }
 
 // Helper functions
-function calculatePatterns(metrics) {
-  if (!metrics.length) {
+function formatPatterns(patterns) {
+  if (!patterns || patterns.avg_sleep_hours == null) {
     return {
       optimalSleep: '7.5h',
       bestBedtime: '10 PM',
@@ -308,31 +329,19 @@ function calculatePatterns(metrics) {
     };
   }
 
-  const avgSleep = metrics.reduce((sum, m) => sum + (m.sleep_duration || 0), 0) / metrics.length;
-  const avgSteps = metrics.reduce((sum, m) => sum + (m.steps || 0), 0) / metrics.length;
-  
-  // Calculate best bedtime from bedtime_start timestamps
-  const bedtimes = metrics
-    .filter(m => m.bedtime_start)
-    .map(m => {
-      const date = new Date(m.bedtime_start);
-      return date.getHours() + date.getMinutes() / 60;
-    });
-  
+  // avg_bedtime is "HH:MM" (24h) in the browser's timezone
   let bestBedtime = '10 PM';
-  if (bedtimes.length > 0) {
-    const avgBedtimeHour = bedtimes.reduce((sum, h) => sum + h, 0) / bedtimes.length;
-    const hour = Math.floor(avgBedtimeHour);
-    const minute = Math.round((avgBedtimeHour - hour) * 60);
+  if (patterns.avg_bedtime) {
+    const [hour, minute] = patterns.avg_bedtime.split(':').map(Number);
     const period = hour >= 12 ? 'PM' : 'AM';
     const displayHour = hour > 12 ? hour - 12 : (hour === 0 ? 12 : hour);
     bestBedtime = `${displayHour}:${minute.toString().padStart(2, '0')} ${period}`;
   }
 
   return {
-    optimalSleep: `${avgSleep.toFixed(1)}h`,
+    optimalSleep: `${patterns.avg_sleep_hours.toFixed(1)}h`,
     bestBedtime: bestBedtime,
-    avgSteps: Math.round(avgSteps).toLocaleString(),
+    avgSteps: (patterns.avg_steps || 0).toLocaleString(),
   };
 }
 
@@ -13,21 +13,33 @@ const api = axios.create({
   withCredentials: true, // Important for Django sessions
 });
 
+// Auth header for the current session token (empty when logged out)
+const authHeaders = () => {
+  const token = localStorage.getItem('auth_token');
+  return token ? { Authorization: `Bearer ${token}` } : {};
+};
+
 // Add auth token to requests
 api.interceptors.request.use((config) => {
-  const token = localStorage.getItem('auth_token');
-  if (token) {
-    config.headers.Authorization = `Bearer ${token}`;
-  }
+  Object.assign(config.headers, authHeaders());
   return config;
 });
 
 // API functions
 export const apiService = {
-  // Get metrics
-  getMetrics: async (force = false) => {
-    const url = force ? '/metrics/?force=true' : '/metrics/';
-    const response = await api.get(url);
+  // Get metrics, newest first. Optional { limit, fields, start, end, cursor };
+  // pass data.next_cursor back as cursor for the next (older) page
+  getMetrics: async (force = false, { limit, fields, start, end, cursor } = {}) => {
+    const params = { limit, start, end, cursor, fields: fields?.join(',') };
+    if (force) params.force = true;
+    const response = await api.get('/metrics/', { params });
+    return response.data;
+  },
+
+  // Get averages/trends/patterns for the last `window` days (computed server-side)
+  getMetricsSummary: async (window = 7) => {
+    const tz = Intl.DateTimeFormat().resolvedOptions().timeZone;
+    const response = await api.get('/metrics/summary/', { params: { window, tz } });
     return response.data;
   },
 
@@ -38,6 +50,14 @@ export const apiService = {
     return response.data;
   },
 
+  // Heart rate for a date range, downsampled server-side (min/avg/max per bucket).
+  // Returns { t0, bucket_seconds, min, avg, max }: entry i covers t0 + i * bucket_seconds
+  // (unix seconds), null where there's no data. bucket is optional (seconds)
+  getHeartRate: async ({ start, end, bucket } = {}) => {
+    const response = await api.get('/heartrate/', { params: { start, end, bucket } });
+    return response.data;
+  },
+
   // Get coach summary
   getCoachSummary: async (force = false) => {
     const response = await api.post('/coach-summary/', { force });
@@ -56,6 +76,87 @@ export const apiService = {
     return response.data;
   },
 
+  // Stream a chat reply over SSE; onDelta gets each chunk of text as it arrives.
+  // axios can't read a response incrementally in the browser, so this uses fetch
+  // (which skips the interceptor, hence authHeaders)
+  streamChatMessage: async (message, onDelta) => {
+    const response = await fetch(`${API_BASE_URL}/chat/?stream=1`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', ...authHeaders() },
+      credentials: 'include',
+      body: JSON.stringify({ message }),
+    });
+    if (!response.ok || !response.body) {
+      throw new Error(`Chat stream failed: ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      // SSE events are separated by a blank line
+      const events = buffer.split('\n\n');
+      buffer = events.pop();
+      for (const event of events) {
+        const lines = event.split('\n');
+        const type = lines.find(l => l.startsWith('event: '))?.slice(7) || 'message';
+        const data = lines.find(l => l.startsWith('data: '))?.slice(6);
+        if (!data) continue;
+        const payload = JSON.parse(data);
+        if (type === 'error') throw new Error(payload.response);
+        if (type === 'done') return;
+        onDelta(payload.delta);
+      }
+    }
+  },
+
+  // Pull long history from /export/ (NDJSON, one columnar chunk per line).
+  // Returns { fields, columns: { field: [...] }, rows }; onChunk(rowsSoFar) for progress
+  exportHistory: async ({ resource = 'metrics', start, end, fields } = {}, onChunk) => {
+    const params = new URLSearchParams({ resource });
+    if (start) params.set('start', start);
+    if (end) params.set('end', end);
+    if (fields) params.set('fields', fields.join(','));
+
+    const response = await fetch(`${API_BASE_URL}/export/?${params}`, {
+      headers: authHeaders(),
+      credentials: 'include',
+    });
+    if (!response.ok || !response.body) {
+      throw new Error(`Export failed: ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    const result = { fields: [], columns: {}, rows: 0 };
+    let buffer = '';
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      const lines = buffer.split('\n');
+      buffer = lines.pop();
+      for (const line of lines) {
+        if (!line) continue;
+        const msg = JSON.parse(line);
+        if (msg.fields) {
+          result.fields = msg.fields;
+          msg.fields.forEach(f => { result.columns[f] = []; });
+        } else if (msg.columns) {
+          for (const f of result.fields) result.columns[f].push(...msg.columns[f]);
+          result.rows += msg.rows;
+          onChunk?.(result.rows);
+        }
+      }
+    }
+    return result;
+  },
+
   // Connect Oura account
   connectOura: async (token) => {
     const response = await api.post('/connect-oura/', { token });